@@ -1,15 +1,153 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from django.db.models import Count
-from .models import Conversation, Message, DocumentUpload
+from .models import Conversation, Message, DocumentUpload, ScreeningResult
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filtre par clé étrangère avec champ de recherche (select2) : les choix sont chargés
+    à la demande via la vue d'autocomplétion de l'admin au lieu de lister toute la table.
+    Le ModelAdmin de la table liée doit définir `search_fields`.
+    """
+    template = 'admin/chatbot/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f'{self.field_name}__id__exact'
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field(self.field_name)
+        self.widget_id = f'autocomplete-filter-{self.field_name}'
+        form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.rendered_widget = form_field.widget.render(
+            self.parameter_name, self.value(), attrs={'id': self.widget_id, 'style': 'width: 100%'}
+        )
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class ConversationFilter(AutocompleteFilter):
+    title = 'conversation'
+    field_name = 'conversation'
+
+
+class SenderFilter(AutocompleteFilter):
+    title = 'expéditeur'
+    field_name = 'sender'
+
+
+class UserFilter(AutocompleteFilter):
+    title = 'utilisateur'
+    field_name = 'user'
+
+
+class BotMessageFilter(admin.SimpleListFilter):
+    title = 'type de message'
+    parameter_name = 'bot'
+
+    def lookups(self, request, model_admin):
+        return (('1', 'Bot'), ('0', 'Utilisateur'))
+
+    def queryset(self, request, queryset):
+        if self.value() in ('0', '1'):
+            return queryset.filter(sender__isnull=self.value() == '1')
+        return queryset
+
+
+class ScoreRangeFilter(admin.SimpleListFilter):
+    """Tranches de note fixes : pas de SELECT DISTINCT sur toute la table à chaque affichage"""
+    title = 'note LLM'
+    parameter_name = 'score'
+    ranges = {'high': (8, 10), 'medium': (5, 7), 'low': (0, 4)}
+
+    def lookups(self, request, model_admin):
+        return (('high', '8 à 10'), ('medium', '5 à 7'), ('low', '0 à 4'))
+
+    def queryset(self, request, queryset):
+        if self.value() in self.ranges:
+            return queryset.filter(score_llm__range=self.ranges[self.value()])
+        return queryset
+
+
+def estimated_count(model):
+    """
+    Estimation rapide du nombre de lignes d'une table, sans COUNT(*) :
+    statistiques du planificateur sous PostgreSQL/MySQL, plus grand identifiant sous SQLite.
+    """
+    connection = connections['default']
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+            )
+        else:
+            cursor.execute(f'SELECT MAX({model._meta.pk.column}) FROM {connection.ops.quote_name(table)}')
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Pagination de l'admin utilisant une estimation du nombre de lignes pour les
+    grandes tables non filtrées ; le COUNT(*) exact reste utilisé dès qu'un filtre
+    ou une recherche réduit la liste, ou si la table est petite.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate > self.exact_count_threshold:
+                return estimate
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Pas de second COUNT(*) sur toute la table pour afficher "x résultats (y au total)"
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if any(isinstance(f, type) and issubclass(f, AutocompleteFilter) for f in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+        return media
 
 
 @admin.register(Conversation)
-class ConversationAdmin(admin.ModelAdmin):
+class ConversationAdmin(ScalableModelAdmin):
     list_display = ['id', 'title', 'user', 'document_info', 'message_count', 'created_at', 'updated_at']
-    list_filter = ['created_at', 'updated_at', 'user']
+    list_filter = ['created_at', 'updated_at', UserFilter]
+    list_select_related = ['user', 'document']
     search_fields = ['title', 'user__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'message_count']
+    autocomplete_fields = ['user', 'document']
     list_per_page = 25
 
     fieldsets = (
@@ -17,20 +155,11 @@ class ConversationAdmin(admin.ModelAdmin):
             'fields': ('user', 'title', 'document')
         }),
         ('Dates', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('created_at', 'updated_at', 'message_count'),
             'classes': ('collapse',)
         }),
     )
 
-    # Annoter le nombre de messages dans chaque conversation
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(message_count=Count('messages'))
-
-    def message_count(self, obj):
-        return obj.message_count
-    message_count.short_description = 'Messages'
-    message_count.admin_order_field = 'message_count'
-
     # Afficher un résumé du document lié à la conversation
     def document_info(self, obj):
         if obj.document:
@@ -45,11 +174,13 @@ class ConversationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(ScalableModelAdmin):
     list_display = ['id', 'conversation_title', 'content_preview', 'sender_display', 'timestamp']
-    list_filter = ['timestamp', 'sender', 'conversation']
+    list_filter = ['timestamp', BotMessageFilter, SenderFilter, ConversationFilter]
+    list_select_related = ['conversation', 'sender']
     search_fields = ['content', 'conversation__title', 'sender__username']
     readonly_fields = ['timestamp']
+    autocomplete_fields = ['conversation', 'sender']
     list_per_page = 50
 
     fieldsets = (
@@ -62,12 +193,48 @@ class MessageAdmin(admin.ModelAdmin):
         }),
     )
 
+    # Ne charger que le début du contenu pour la liste, pas les réponses complètes
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('changelist'):
+            queryset = queryset.defer('content').annotate(content_start=Substr('content', 1, 101))
+        return queryset
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            previous_id = None
+            if change:
+                previous_id = Message.objects.select_for_update().filter(pk=obj.pk) \
+                    .values_list('conversation_id', flat=True).first()
+            super().save_model(request, obj, form, change)
+            # Message déplacé vers une autre conversation : mettre à jour les deux compteurs
+            if previous_id is not None and previous_id != obj.conversation_id:
+                Conversation.objects.filter(pk=previous_id).update(message_count=F('message_count') - 1)
+            if not change or previous_id != obj.conversation_id:
+                Conversation.objects.filter(pk=obj.conversation_id).update(message_count=F('message_count') + 1)
+
+    def delete_model(self, request, obj):
+        conversation_id = obj.conversation_id
+        super().delete_model(request, obj)
+        Conversation.objects.filter(pk=conversation_id).update(message_count=F('message_count') - 1)
+
+    def delete_queryset(self, request, queryset):
+        deleted = {}
+        for conversation_id in queryset.values_list('conversation_id', flat=True):
+            deleted[conversation_id] = deleted.get(conversation_id, 0) + 1
+        super().delete_queryset(request, queryset)
+        for conversation_id, count in deleted.items():
+            Conversation.objects.filter(pk=conversation_id).update(message_count=F('message_count') - count)
+
     def conversation_title(self, obj):
         return obj.conversation.title or f"Conversation {obj.conversation.id}"
     conversation_title.short_description = 'Conversation'
 
     def content_preview(self, obj):
-        return obj.content[:100] + "..." if len(obj.content) > 100 else obj.content
+        content = getattr(obj, 'content_start', None)
+        if content is None:
+            content = obj.content
+        return content[:100] + "..." if len(content) > 100 else content
     content_preview.short_description = 'Contenu'
 
     def sender_display(self, obj):
@@ -78,16 +245,17 @@ class MessageAdmin(admin.ModelAdmin):
 
 
 @admin.register(DocumentUpload)
-class DocumentUploadAdmin(admin.ModelAdmin):
+class DocumentUploadAdmin(ScalableModelAdmin):
     list_display = ['filename', 'user', 'file_size_formatted', 'upload_date', 'indexing_status']
-    list_filter = ['is_indexed', 'upload_date', 'indexing_date', 'user']
+    list_filter = ['is_indexed', 'upload_date', 'indexing_date', UserFilter]
+    list_select_related = ['user']
     search_fields = ['filename', 'user__username']
-    readonly_fields = ['upload_date', 'file_size']
+    readonly_fields = ['upload_date', 'file_size', 'content_hash']
     list_per_page = 25
 
     fieldsets = (
         ('Fichier', {
-            'fields': ('filename', 'file_size', 'user')
+            'fields': ('filename', 'file_size', 'content_hash', 'user')
         }),
         ('Indexation', {
             'fields': ('is_indexed', 'indexing_date'),
@@ -120,6 +288,23 @@ class DocumentUploadAdmin(admin.ModelAdmin):
     indexing_status.short_description = "Statut d'indexation"
 
 
+@admin.register(ScreeningResult)
+class ScreeningResultAdmin(ScalableModelAdmin):
+    list_display = ['id', 'filename', 'score_llm', 'score_faiss', 'decision', 'conversation', 'message']
+    list_filter = ['decision', ScoreRangeFilter, ConversationFilter]
+    list_select_related = ['conversation', 'message']
+    search_fields = ['filename']
+    readonly_fields = ['conversation', 'message', 'document', 'rank', 'justification']
+    list_per_page = 50
+
+    # La justification (compressée) et le texte du message lié ne sont lus que sur la page de détail
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('changelist'):
+            queryset = queryset.defer('justification', 'message__content')
+        return queryset
+
+
 admin.site.site_header = "Administration CV Assistant"
 admin.site.site_title = "CV Assistant Admin"
 admin.site.index_title = "Gestion du système RAG"
@@ -8,7 +8,15 @@ load_dotenv()
 # Récupérer une variable
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# URL de l'API (ex. serveur local `python manage.py mock_openai` pour les tests de charge)
+openai_base_url = os.getenv("OPENAI_BASE_URL") or None
+
+# Découpage tiktoken des textes trop longs (nécessite de télécharger l'encodage ; à désactiver hors ligne)
+check_embedding_ctx_length = os.getenv("OPENAI_EMBEDDINGS_CHECK_CTX_LENGTH", "True").lower() in ("true", "1", "yes")
+
 # Embeddings OpenAI
 embeddings = OpenAIEmbeddings(
     model="text-embedding-3-large",
-     openai_api_key=openai_api_key)
\ No newline at end of file
+     openai_api_key=openai_api_key,
+     base_url=openai_base_url,
+     check_embedding_ctx_length=check_embedding_ctx_length)
@@ -0,0 +1,60 @@
+import zstandard
+from django.db import models
+
+# Premier octet de la valeur stockée : texte brut ou compressé avec zstd
+_RAW = b"r"
+_ZSTD = b"z"
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Texte stocké en binaire, compressé avec zstandard au-delà de `min_length` octets.
+    Les textes courts restent en clair (la compression n'y gagne rien) ;
+    la valeur Python est toujours une chaîne.
+    """
+
+    def __init__(self, *args, min_length=256, level=3, **kwargs):
+        self.min_length = min_length
+        self.level = level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.min_length != 256:
+            kwargs["min_length"] = self.min_length
+        if self.level != 3:
+            kwargs["level"] = self.level
+        return name, path, args, kwargs
+
+    def compress(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if len(data) < self.min_length:
+            return _RAW + data
+        return _ZSTD + zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    @staticmethod
+    def decompress(value) -> str:
+        value = bytes(value)
+        if not value:
+            return ""
+        if value[:1] == _ZSTD:
+            return zstandard.ZstdDecompressor().decompress(value[1:]).decode("utf-8")
+        return value[1:].decode("utf-8")
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.decompress(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self.decompress(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        return self.compress(value)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.rag_system.benchmark import compare_results, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark hors ligne de l'indexation et du tri des CV sur des corpus synthétiques, "
+        "avec des modèles locaux à latence simulée à la place d'OpenAI."
+    )
+    # Les vérifications système importent les vues, donc les clients OpenAI, avant que
+    # `local_models` n'ait pu fournir une clé factice : inutiles pour un benchmark
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000],
+                            help="Tailles des corpus synthétiques")
+        parser.add_argument('--repeat', type=int, default=3, help="Répétitions de chaque requête")
+        parser.add_argument('--embedding-latency', type=float, default=0.0,
+                            help="Latence simulée par appel d'embedding (secondes)")
+        parser.add_argument('--embedding-dimension', type=int, default=3072,
+                            help="Dimension des embeddings simulés (3072 pour text-embedding-3-large)")
+        parser.add_argument('--llm-latency', type=float, default=0.0,
+                            help="Latence simulée par appel LLM (secondes)")
+        parser.add_argument('--llm-jitter', type=float, default=0.0,
+                            help="Variation aléatoire de la latence LLM (secondes)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=Path, help="Écrire les résultats en JSON")
+        parser.add_argument('--baseline', type=Path,
+                            help="Résultats JSON de référence à comparer (ex. commit précédent)")
+        parser.add_argument('--tolerance', type=float, default=0.10,
+                            help="Dégradation tolérée avant de signaler une régression")
+
+    def handle(self, *args, **options):
+        results = run_benchmark(
+            sizes=options['sizes'],
+            repeat=options['repeat'],
+            embedding_latency=options['embedding_latency'],
+            embedding_dimension=options['embedding_dimension'],
+            llm_latency=options['llm_latency'],
+            llm_jitter=options['llm_jitter'],
+            seed=options['seed'],
+        )
+
+        columns = ['corpus_size', 'indexing_docs_per_second', 'index_vectors', 'index_bytes',
+                   'ask_question_p50', 'ask_question_p95', 'ask_question_p99', 'peak_rss_mb']
+        self.stdout.write("".join(f"{c:>26}" for c in columns))
+        for run in results['runs']:
+            self.stdout.write("".join(f"{run[c]:>26}" for c in columns))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                regressions = compare_results(json.load(f), results, options['tolerance'])
+            if regressions:
+                raise CommandError("Régressions détectées :\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Aucune régression par rapport à la référence"))
@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from langchain_community.vectorstores import FAISS
+
+from chatbot.models import DocumentUpload
+from chatbot.rag_system.chunking import get_splitter, get_token_counter, load_chunking_config
+from chatbot.rag_system.indexing import IndexingService
+from chatbot.rag_system.local_models import HashingEmbeddings
+from chatbot.storage import filenames_by_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare hors ligne le découpage actuel (caractères) et le découpage par sections : "
+        "nombre de chunks, taille d'index et qualité de recherche (recall@k, MRR)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-folder', type=Path, default=settings.DATA_FOLDER,
+                            help="Dossier du corpus de CV")
+        parser.add_argument('--queries', type=Path,
+                            help='Fichier JSON : [{"query": "...", "relevant": ["cv1.pdf", ...]}, ...]')
+        parser.add_argument('--k', type=int, default=10, help="Nombre de chunks récupérés par requête")
+        parser.add_argument('--openai', action='store_true',
+                            help="Utiliser les embeddings OpenAI au lieu des embeddings locaux")
+        parser.add_argument('--output', type=Path, help="Écrire les résultats en JSON")
+
+    def handle(self, *args, **options):
+        docs = IndexingService.load_documents(options['data_folder'])
+        if not docs:
+            raise CommandError(f"Aucun document trouvé dans {options['data_folder']}")
+        # Les uploads sont stockés sous leur empreinte : retrouver les noms d'origine
+        # pour les comparer à ceux du fichier de requêtes
+        aliases = IndexingService.label_documents(
+            docs, filenames_by_hash(DocumentUpload.objects.exclude(content_hash=''))
+        )
+        docs = IndexingService.named_documents(docs)
+
+        queries = []
+        if options['queries']:
+            with open(options['queries'], encoding='utf-8') as f:
+                queries = json.load(f)
+
+        if options['openai']:
+            from chatbot.config import embeddings
+        else:
+            embeddings = HashingEmbeddings()
+
+        corpus_config = load_chunking_config(options['data_folder'])
+        strategies = {
+            'recursive': {**corpus_config, 'strategy': 'recursive'},
+            'cv_sections': {**corpus_config, 'strategy': 'cv_sections'},
+        }
+
+        report = {}
+        for name, config in strategies.items():
+            chunks = get_splitter(config).split_documents(docs)
+            report[name] = self.evaluate(chunks, embeddings, queries, options['k'], aliases)
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+    def evaluate(self, chunks, embeddings, queries, k, aliases):
+        count_tokens = get_token_counter()
+        tokens = [count_tokens(c.page_content) for c in chunks]
+        vectorstore = FAISS.from_documents(chunks, embeddings)
+
+        result = {
+            'chunks': len(chunks),
+            'avg_tokens': round(sum(tokens) / len(tokens), 1) if tokens else 0,
+            'max_tokens': max(tokens, default=0),
+            'index_bytes': len(vectorstore.serialize_to_bytes()),
+        }
+
+        if queries:
+            recalls, reciprocal_ranks = [], []
+            for q in queries:
+                relevant = {aliases.get(name, name) for name in q['relevant']}
+                hits = vectorstore.similarity_search_with_score(q['query'], k=k)
+                # Classement des fichiers par ordre de première apparition
+                ranked = list(dict.fromkeys(d.metadata.get('filename') for d, _ in hits))
+                recalls.append(len(relevant & set(ranked)) / len(relevant) if relevant else 0)
+                rank = next((i + 1 for i, name in enumerate(ranked) if name in relevant), None)
+                reciprocal_ranks.append(1 / rank if rank else 0)
+            result['recall_at_k'] = round(sum(recalls) / len(recalls), 3)
+            result['mrr'] = round(sum(reciprocal_ranks) / len(reciprocal_ranks), 3)
+
+        return result
+
+    def print_report(self, report):
+        columns = ['chunks', 'avg_tokens', 'max_tokens', 'index_bytes', 'recall_at_k', 'mrr']
+        self.stdout.write(f"{'stratégie':<12}" + "".join(f"{c:>14}" for c in columns))
+        for name, result in report.items():
+            self.stdout.write(f"{name:<12}" + "".join(f"{str(result.get(c, '-')):>14}" for c in columns))
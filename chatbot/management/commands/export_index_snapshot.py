@@ -0,0 +1,37 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.rag_system.snapshot import SnapshotError, export_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte l'index FAISS (index, docstore, table d'alias) dans une archive zstd "
+        "avec manifeste et empreintes SHA-256, à importer sur un autre serveur avec import_index_snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=Path, nargs='?',
+                            help="Archive à créer (défaut : faiss_index-<date>.tar.zst)")
+        parser.add_argument('--index-dir', type=Path, default=settings.FAISS_INDEX_DIR)
+        parser.add_argument('--level', type=int, default=10, help="Niveau de compression zstd (1-22)")
+
+    def handle(self, *args, **options):
+        output = options['output'] or Path(f"faiss_index-{time.strftime('%Y%m%d-%H%M%S')}.tar.zst")
+        start = time.perf_counter()
+        try:
+            manifest = export_snapshot(output, index_dir=options['index_dir'], level=options['level'])
+        except SnapshotError as e:
+            raise CommandError(str(e))
+
+        raw_size = sum(f['size'] for f in manifest['files'].values())
+        archive = manifest['archive']
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot exporté : {archive['path']} ({manifest['vectors']} vecteurs, "
+            f"{raw_size / 1e6:.1f} Mo -> {archive['size'] / 1e6:.1f} Mo) "
+            f"en {time.perf_counter() - start:.1f} s"
+        ))
+        self.stdout.write(f"SHA-256 : {archive['sha256']}")
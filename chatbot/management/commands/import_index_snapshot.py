@@ -0,0 +1,44 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.rag_system.snapshot import SnapshotError, import_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe une archive créée par export_index_snapshot : vérifie les empreintes et la "
+        "cohérence de l'index, puis remplace l'index FAISS local par renommage atomique."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', type=Path)
+        parser.add_argument('--index-dir', type=Path, default=settings.FAISS_INDEX_DIR)
+        parser.add_argument('--checksum',
+                            help="SHA-256 attendu de l'archive (défaut : fichier <archive>.sha256)")
+        parser.add_argument('--force', action='store_true', help="Remplacer un index existant")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            manifest = import_snapshot(
+                options['archive'],
+                index_dir=options['index_dir'],
+                checksum=options['checksum'],
+                force=options['force'],
+            )
+        except SnapshotError as e:
+            raise CommandError(str(e))
+
+        if not manifest['embedding_model_matches']:
+            self.stderr.write(self.style.WARNING(
+                f"Index construit avec le modèle d'embedding {manifest['embedding_model']} : "
+                "les requêtes doivent utiliser le même modèle"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Index importé dans {options['index_dir']} : {manifest['vectors']} vecteurs "
+            f"(snapshot du {manifest['created_at']}, commit {manifest['commit']}) "
+            f"en {time.perf_counter() - start:.1f} s"
+        ))
@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from chatbot.rag_system.load_test import LoadTestConfig, run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge HTTP : des utilisateurs simulés concurrents appellent upload_cvs, "
+        "index_cvs et send_message ; rapport de débit, latences p50/p95/p99 et taux d'erreur."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help="URL de l'application")
+        parser.add_argument('--users', type=int, default=20, help="Utilisateurs simulés concurrents")
+        parser.add_argument('--messages', type=int, default=5, help="Messages envoyés par utilisateur")
+        parser.add_argument('--cvs-per-upload', type=int, default=5)
+        parser.add_argument('--upload-ratio', type=float, default=0.2,
+                            help="Part des utilisateurs qui uploadent et indexent des CV")
+        parser.add_argument('--think-time', type=float, default=0.5,
+                            help="Pause moyenne entre deux messages (secondes)")
+        parser.add_argument('--timeout', type=float, default=120.0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=Path, help="Écrire le rapport en JSON")
+
+    def handle(self, *args, **options):
+        report = run_load_test(LoadTestConfig(
+            base_url=options['base_url'],
+            users=options['users'],
+            messages_per_user=options['messages'],
+            cvs_per_upload=options['cvs_per_upload'],
+            upload_ratio=options['upload_ratio'],
+            think_time=options['think_time'],
+            timeout=options['timeout'],
+            seed=options['seed'],
+        ))
+
+        columns = ['requests', 'errors', 'error_rate', 'throughput_rps', 'p50', 'p95', 'p99', 'max']
+        self.stdout.write(f"{'endpoint':<14}" + "".join(f"{c:>16}" for c in columns))
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(f"{endpoint:<14}" + "".join(f"{stats[c]:>16}" for c in columns))
+        self.stdout.write(f"Durée totale : {report['elapsed_seconds']} s")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from chatbot.rag_system.mock_openai import MockOpenAIConfig, MockOpenAIServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Lance un serveur local compatible avec l'API OpenAI (chat/completions, embeddings) "
+        "pour les tests de charge. Démarrer l'application avec OPENAI_BASE_URL=http://<hôte>:<port>/v1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--chat-latency', type=float, default=0.8,
+                            help="Latence moyenne des complétions (secondes)")
+        parser.add_argument('--embedding-latency', type=float, default=0.05,
+                            help="Latence moyenne des embeddings (secondes)")
+        parser.add_argument('--distribution', choices=['fixed', 'uniform', 'lognormal'], default='lognormal',
+                            help="Distribution des latences")
+        parser.add_argument('--jitter', type=float, default=0.3,
+                            help="Écart (uniform) ou sigma (lognormal) de la latence")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Proportion de réponses HTTP 500 simulées")
+        parser.add_argument('--rate-limit', type=float, default=0.0,
+                            help="Requêtes par seconde autorisées avant HTTP 429 (0 = illimité)")
+        parser.add_argument('--burst', type=int, default=10)
+        parser.add_argument('--dimension', type=int, default=3072, help="Dimension des embeddings")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--verbose', action='store_true')
+
+    def handle(self, *args, **options):
+        config = MockOpenAIConfig(
+            chat_latency=options['chat_latency'],
+            embedding_latency=options['embedding_latency'],
+            latency_distribution=options['distribution'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            burst=options['burst'],
+            embedding_dimension=options['dimension'],
+            seed=options['seed'],
+            verbose=options['verbose'],
+        )
+        server = MockOpenAIServer((options['host'], options['port']), config)
+        self.stdout.write(f"Serveur OpenAI simulé sur {server.base_url} (Ctrl+C pour arrêter)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            stats = server.stats
+            self.stdout.write(
+                f"{stats.requests} requêtes, {stats.throttled} limitées (429), {stats.errors} erreurs (500)"
+            )
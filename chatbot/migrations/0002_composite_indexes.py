@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='conv_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentupload',
+            index=models.Index(fields=['user', '-upload_date', '-id'], name='doc_user_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'timestamp', 'id'], name='msg_conv_timestamp_idx'),
+        ),
+    ]
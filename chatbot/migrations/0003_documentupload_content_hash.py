@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentupload',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
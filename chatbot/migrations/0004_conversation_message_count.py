@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_message_count(apps, schema_editor):
+    Conversation = apps.get_model('chatbot', 'Conversation')
+    Message = apps.get_model('chatbot', 'Message')
+    counts = (
+        Message.objects.filter(conversation=OuterRef('pk'))
+        .order_by()
+        .values('conversation')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Conversation.objects.update(message_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0003_documentupload_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_message_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:18
+
+import chatbot.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0004_conversation_message_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScreeningResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('filename', models.CharField(max_length=255)),
+                ('score_faiss', models.FloatField()),
+                ('score_llm', models.PositiveSmallIntegerField()),
+                ('decision', models.CharField(blank=True, choices=[('keep', 'À conserver'), ('reject', 'À écarter')], default='', max_length=10)),
+                ('justification', chatbot.fields.CompressedTextField()),
+                ('aliases', models.JSONField(blank=True, default=list)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='screening_results', to='chatbot.conversation')),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='chatbot.documentupload')),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='screening_results', to='chatbot.message')),
+            ],
+            options={
+                'ordering': ['message', 'rank'],
+                'indexes': [models.Index(fields=['conversation', '-score_llm'], name='screening_conv_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('message', 'rank'), name='screening_message_rank_uniq')],
+            },
+        ),
+    ]
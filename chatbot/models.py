@@ -1,11 +1,15 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .fields import CompressedTextField
+
 
 class DocumentUpload(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     filename = models.CharField(max_length=255)
     file_size = models.IntegerField()
+    # SHA-256 du contenu : le fichier est stocké sous DATA_FOLDER/<hash[:2]>/<hash><ext>
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     upload_date = models.DateTimeField(auto_now_add=True)
     is_indexed = models.BooleanField(default=False)
     indexing_date = models.DateTimeField(null=True, blank=True)
@@ -15,6 +19,9 @@ class DocumentUpload(models.Model):
 
     class Meta:
         ordering = ['-upload_date']
+        indexes = [
+            models.Index(fields=['user', '-upload_date', '-id'], name='doc_user_upload_idx'),
+        ]
 
 class Conversation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -22,13 +29,64 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     document = models.ForeignKey(DocumentUpload, on_delete=models.SET_NULL, null=True, blank=True)
+    # Compteur dénormalisé, mis à jour à l'envoi des messages (évite un COUNT par conversation)
+    message_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.title or 'Conversation'} ({self.id})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-updated_at', '-id'], name='conv_user_updated_idx'),
+        ]
+
         
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, related_name="messages", on_delete=models.CASCADE)
     sender = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='msg_conv_timestamp_idx'),
+        ]
+
+
+class ScreeningResult(models.Model):
+    """Évaluation d'un CV par le LLM, rattachée à la réponse du bot qui la présente"""
+    DECISION_KEEP = 'keep'
+    DECISION_REJECT = 'reject'
+    DECISION_CHOICES = [
+        (DECISION_KEEP, 'À conserver'),
+        (DECISION_REJECT, 'À écarter'),
+    ]
+
+    conversation = models.ForeignKey(Conversation, related_name="screening_results", on_delete=models.CASCADE)
+    message = models.ForeignKey(Message, related_name="screening_results", on_delete=models.CASCADE)
+    document = models.ForeignKey(DocumentUpload, on_delete=models.SET_NULL, null=True, blank=True)
+    rank = models.PositiveSmallIntegerField()
+    filename = models.CharField(max_length=255)
+    score_faiss = models.FloatField()
+    score_llm = models.PositiveSmallIntegerField()
+    decision = models.CharField(max_length=10, choices=DECISION_CHOICES, blank=True, default='')
+    justification = CompressedTextField()
+    # Fichiers écartés comme doublons du CV évalué
+    aliases = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.score_llm}/10)"
+
+    def summary(self):
+        """Ligne compacte utilisée dans l'historique envoyé au LLM"""
+        decision = f", {self.get_decision_display()}" if self.decision else ""
+        return f"{self.filename} — {self.score_llm}/10{decision}"
+
+    class Meta:
+        ordering = ['message', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['message', 'rank'], name='screening_message_rank_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['conversation', '-score_llm'], name='screening_conv_score_idx'),
+        ]
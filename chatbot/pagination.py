@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: list) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, fields: list) -> list:
+    """
+    Décoder un curseur et convertir chaque valeur avec le champ de modèle correspondant
+    (`fields` : instances de Field). Toute valeur invalide lève InvalidCursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Curseur de pagination invalide") from e
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor("Curseur de pagination invalide")
+
+    converted = []
+    for field, value in zip(fields, values):
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise InvalidCursor("Curseur de pagination invalide")
+        try:
+            # to_python, puis validation (valeur vide, bornes des entiers de la base)
+            value = field.clean(value, None)
+        except (ValidationError, TypeError, ValueError, OverflowError) as e:
+            raise InvalidCursor("Curseur de pagination invalide") from e
+        if isinstance(value, datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        converted.append(value)
+    return converted
+
+
+def parse_limit(raw, default: int = DEFAULT_PAGE_SIZE) -> int:
+    try:
+        return max(1, min(int(raw), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def keyset_paginate(queryset, ordering: list, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    Pagination par clé (keyset) : au lieu d'un OFFSET, on filtre sur les valeurs de tri
+    du dernier élément de la page précédente, ce qui reste rapide quelle que soit la page.
+
+    `ordering` suit la syntaxe de order_by (ex. ['-updated_at', '-id']) et doit se
+    terminer par une clé unique. Retourne (éléments, curseur suivant ou None).
+    """
+    fields = [f.lstrip("-") for f in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        values = decode_cursor(cursor, [queryset.model._meta.get_field(f) for f in fields])
+        # (a, b) après (va, vb) : a < va OU (a = va ET b < vb), pour chaque niveau de tri
+        condition = Q()
+        for i, order in enumerate(ordering):
+            lookup = "lt" if order.startswith("-") else "gt"
+            clause = Q(**{f"{fields[i]}__{lookup}": values[i]})
+            for j in range(i):
+                clause &= Q(**{fields[j]: values[j]})
+            condition |= clause
+        queryset = queryset.filter(condition)
+
+    items = list(queryset[:limit + 1])
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, f) for f in fields])
+    return items, next_cursor
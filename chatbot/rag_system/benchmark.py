@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from django.test import override_settings
+
+from .local_models import FakeChatModel, HashingEmbeddings
+
+FIRST_NAMES = ["Jean", "Marie", "Karim", "Sofia", "Lucas", "Inès", "Thomas", "Yasmine", "Hugo", "Léa"]
+LAST_NAMES = ["Dupont", "Martin", "Benali", "Bernard", "Petit", "Moreau", "Haddad", "Laurent", "Roux", "Garcia"]
+TITLES = ["Développeur Python", "Data scientist", "Ingénieur DevOps", "Chef de projet", "Développeur Java",
+          "Analyste financier", "Consultant SAP", "Ingénieur réseau", "Designer UX", "Comptable"]
+SKILLS = ["Python", "Django", "FastAPI", "Java", "Spring", "Docker", "Kubernetes", "AWS", "SQL", "PostgreSQL",
+          "Machine learning", "PyTorch", "Pandas", "React", "TypeScript", "Scrum", "Excel", "SAP", "Figma", "Linux"]
+COMPANIES = ["Fintech SA", "WebAgency", "Banque Populaire", "Capgemini", "StartupLab", "Orange", "Thales", "Decathlon"]
+SCHOOLS = ["Université de Lyon", "INSA Toulouse", "Université Paris-Saclay", "EPITA", "Sorbonne Université"]
+
+DEFAULT_QUERIES = [
+    "Trouve-moi des développeurs Python",
+    "Qui a de l'expérience en machine learning ?",
+    "Candidats maîtrisant Docker et Kubernetes",
+    "Profils de chef de projet Scrum",
+    "Développeur Java Spring avec expérience bancaire",
+]
+
+
+def generate_cv(rng: random.Random) -> str:
+    """Générer un CV synthétique structuré en sections"""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    experiences = "\n\n".join(
+        f"{rng.choice(TITLES)} chez {rng.choice(COMPANIES)} ({2024 - 3 * (i + 1)}-{2024 - 3 * i})\n"
+        f"Projets utilisant {', '.join(rng.sample(SKILLS, 3))}. "
+        f"Encadrement d'une équipe de {rng.randint(2, 8)} personnes."
+        for i in range(rng.randint(1, 4))
+    )
+    return (
+        f"{name}\n{rng.choice(TITLES)}\n\n"
+        f"EXPÉRIENCE PROFESSIONNELLE\n{experiences}\n\n"
+        f"Formation\nMaster, {rng.choice(SCHOOLS)} ({rng.randint(2005, 2020)})\n\n"
+        f"Compétences\n{', '.join(rng.sample(SKILLS, 6))}\n\n"
+        f"Références\nRéférences disponibles sur demande.\n"
+    )
+
+
+def generate_corpus(folder: Path, size: int, seed: int = 0) -> None:
+    """Écrire `size` CV synthétiques (.txt) dans `folder`"""
+    rng = random.Random(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(size):
+        (folder / f"cv_{i:05d}.txt").write_text(generate_cv(rng), encoding="utf-8")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile par interpolation linéaire"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb() -> float:
+    """
+    Pic de mémoire résidente du processus courant (ru_maxrss est en Ko sous Linux).
+    C'est un maximum sur toute la vie du processus : chaque taille de corpus est donc
+    mesurée dans son propre processus (voir `run_benchmark`).
+    """
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+@contextmanager
+def local_models(embedding_latency: float = 0.0, llm_latency: float = 0.0, llm_jitter: float = 0.0,
+                 embedding_dimension: int = 256):
+    """Remplacer les embeddings OpenAI et ChatOpenAI par des modèles locaux déterministes"""
+    # Les clients OpenAI sont construits à l'import de config et llm_processing et exigent
+    # une clé, même s'ils ne sont jamais appelés : clé factice si aucune n'est définie
+    os.environ.setdefault("OPENAI_API_KEY", "sk-local-models")
+    from . import indexing, llm_processing
+    from .. import config
+
+    fake_embeddings = HashingEmbeddings(dimension=embedding_dimension, latency=embedding_latency)
+    fake_llm = FakeChatModel(latency=llm_latency, jitter=llm_jitter)
+    with mock.patch.object(config, "embeddings", fake_embeddings), \
+            mock.patch.object(indexing, "embeddings", fake_embeddings), \
+            mock.patch.object(llm_processing, "embeddings", fake_embeddings), \
+            mock.patch.object(llm_processing, "ChatOpenAI", lambda **kwargs: fake_llm):
+        yield fake_embeddings, fake_llm
+
+
+def benchmark_size(size: int, queries: List[str], repeat: int, seed: int) -> dict:
+    """Indexer un corpus synthétique de `size` CV puis mesurer `ask_question` (modèles déjà remplacés)"""
+    from .indexing import IndexingService
+    from .llm_processing import LLMService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_folder = Path(tmp) / "raw"
+        index_dir = Path(tmp) / "faiss_index"
+        index_dir.mkdir()
+        generate_corpus(data_folder, size, seed=seed)
+
+        with override_settings(DATA_FOLDER=data_folder, FAISS_INDEX_DIR=index_dir):
+            start = time.perf_counter()
+            success, msg = IndexingService.build_vector_store()
+            indexing_seconds = time.perf_counter() - start
+            if not success:
+                raise RuntimeError(msg)
+
+            service = LLMService()
+            latencies = []
+            for _ in range(repeat):
+                for question in queries:
+                    start = time.perf_counter()
+                    _, error = service.ask_question(question)
+                    latencies.append(time.perf_counter() - start)
+                    if error:
+                        raise RuntimeError(error)
+
+            return {
+                "corpus_size": size,
+                "indexing_seconds": round(indexing_seconds, 4),
+                "indexing_docs_per_second": round(size / indexing_seconds, 2),
+                "index_vectors": service.vector_store.index.ntotal,
+                "index_bytes": directory_size(index_dir),
+                "ask_question_p50": round(percentile(latencies, 50), 4),
+                "ask_question_p95": round(percentile(latencies, 95), 4),
+                "ask_question_p99": round(percentile(latencies, 99), 4),
+            }
+
+
+def _benchmark_size_in_child(size: int, queries: List[str], repeat: int, seed: int, models: dict) -> dict:
+    """Point d'entrée du processus fils lancé pour une taille de corpus"""
+    import django
+    django.setup()
+
+    with local_models(**models):
+        run = benchmark_size(size, queries, repeat, seed)
+    run["peak_rss_mb"] = peak_rss_mb()
+    return run
+
+
+def run_benchmark(sizes: List[int], queries: List[str] = None, repeat: int = 3,
+                  embedding_latency: float = 0.0, llm_latency: float = 0.0, llm_jitter: float = 0.0,
+                  embedding_dimension: int = 256, seed: int = 0, isolate: bool = True) -> dict:
+    """
+    Mesurer l'indexation (débit) et le tri des CV (latences p50/p95/p99)
+    pour des corpus synthétiques de différentes tailles.
+
+    Avec `isolate`, chaque taille est mesurée dans un nouveau processus pour que
+    `peak_rss_mb` corresponde à cette taille seule ; sinon tout s'exécute dans le
+    processus courant (métriques du pipeline visibles sur `/metrics`) et le pic de
+    mémoire n'est pas mesuré.
+    """
+    queries = queries or DEFAULT_QUERIES
+    models = {
+        "embedding_latency": embedding_latency, "llm_latency": llm_latency, "llm_jitter": llm_jitter,
+        "embedding_dimension": embedding_dimension,
+    }
+    results = {
+        "commit": current_commit(),
+        "parameters": {"sizes": sizes, "queries": len(queries), "repeat": repeat, "seed": seed, **models},
+        "runs": [],
+    }
+
+    if not isolate:
+        with local_models(**models):
+            for size in sizes:
+                run = benchmark_size(size, queries, repeat, seed)
+                run["peak_rss_mb"] = None
+                results["runs"].append(run)
+        return results
+
+    # "spawn" plutôt que "fork" : le fils part d'un processus neuf (pas de threads
+    # FAISS/OpenMP ni de mémoire hérités du parent)
+    context = multiprocessing.get_context("spawn")
+    for size in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            run = pool.submit(_benchmark_size_in_child, size, queries, repeat, seed, models).result()
+        results["runs"].append(run)
+    return results
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.10) -> List[str]:
+    """Lister les métriques dégradées de plus de `tolerance` par rapport à la référence"""
+    lower_is_better = ["indexing_seconds", "index_bytes", "ask_question_p50", "ask_question_p95",
+                       "ask_question_p99", "peak_rss_mb"]
+    baseline_runs = {r["corpus_size"]: r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in current.get("runs", []):
+        ref = baseline_runs.get(run["corpus_size"])
+        if not ref:
+            continue
+        for metric in lower_is_better:
+            if ref.get(metric) and run.get(metric) is not None and run[metric] > ref[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{metric} (n={run['corpus_size']}) : {ref[metric]} -> {run[metric]} "
+                    f"(+{(run[metric] / ref[metric] - 1) * 100:.1f}%)"
+                )
+    return regressions
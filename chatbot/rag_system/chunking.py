@@ -0,0 +1,233 @@
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Callable, List, Tuple
+
+from django.conf import settings
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Intitulés de sections usuels dans les CV (français et anglais), sans accents
+DEFAULT_SECTION_HEADERS = [
+    "experience", "experiences", "experience professionnelle", "parcours professionnel",
+    "work experience", "employment", "professional experience",
+    "formation", "formations", "education", "diplomes", "etudes", "academic background",
+    "competences", "skills", "competences techniques", "technical skills", "savoir-faire",
+    "langues", "languages",
+    "projets", "projects",
+    "certifications", "certificats",
+    "profil", "profile", "resume", "summary", "a propos", "about me", "objectif",
+    "centres d'interet", "interets", "interests", "loisirs", "hobbies",
+    "references", "publications", "benevolat", "volunteering",
+]
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@lru_cache(maxsize=4)
+def _load_encoding(encoding_name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception:
+        # Pas d'accès au fichier BPE (environnement hors ligne) : approximation locale
+        return None
+
+
+def get_token_counter(encoding_name: str = "cl100k_base") -> Callable[[str], int]:
+    """Compteur de tokens tiktoken, avec repli sur un découpage mots/ponctuation"""
+    encoding = _load_encoding(encoding_name)
+    if encoding is not None:
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    return lambda text: len(_TOKEN_PATTERN.findall(text))
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+class CVSectionSplitter:
+    """
+    Découpage des CV par sections (expérience, formation, compétences...).
+
+    Les chunks sont remplis paragraphe par paragraphe jusqu'à `chunk_tokens` tokens
+    sans jamais mélanger deux sections ; chaque chunk est préfixé par l'intitulé
+    de sa section pour garder le contexte lors de la recherche.
+    """
+
+    def __init__(self, chunk_tokens: int = 400, chunk_overlap_tokens: int = 40,
+                 headers: List[str] = None, encoding_name: str = "cl100k_base"):
+        if chunk_overlap_tokens >= chunk_tokens:
+            raise ValueError("chunk_overlap_tokens doit être inférieur à chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap_tokens = chunk_overlap_tokens
+        self.headers = [self._normalize_header(h) for h in (headers or DEFAULT_SECTION_HEADERS)]
+        self.count_tokens = get_token_counter(encoding_name)
+
+    @staticmethod
+    def _normalize_header(line: str) -> str:
+        line = _strip_accents(line).lower()
+        line = re.sub(r"[^\w'\s-]", " ", line)
+        return re.sub(r"\s+", " ", line).strip()
+
+    def is_known_header(self, line: str) -> bool:
+        """Ligne correspondant à un intitulé de section connu (ex. "Compétences :")"""
+        stripped = line.strip()
+        if not stripped or len(stripped.split()) > 6:
+            return False
+        return self._normalize_header(stripped) in self.headers
+
+    @staticmethod
+    def _is_capitalized(line: str) -> bool:
+        stripped = line.strip()
+        letters = [c for c in stripped if c.isalpha()]
+        return len(letters) >= 4 and all(c.isupper() for c in letters) and len(stripped.split()) <= 4
+
+    def is_header(self, line: str, previous: str = "", following: str = "",
+                  in_known_section: bool = False) -> bool:
+        """
+        Un intitulé connu est toujours un en-tête. Une ligne courte en majuscules hors
+        vocabulaire (ex. "PARCOURS") ne l'est qu'en dehors d'une section connue, si elle
+        ouvre un bloc (début du texte ou ligne vide avant) et qu'elle est suivie d'un
+        contenu : les compétences, diplômes ou employeurs écrits en majuscules restent
+        dans leur section.
+        """
+        if self.is_known_header(line):
+            return True
+        return (
+            not in_known_section and self._is_capitalized(line) and not previous.strip()
+            and bool(following.strip()) and not self.is_known_header(following)
+            and not self._is_capitalized(following)
+        )
+
+    def split_sections(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Retourne la liste (intitulé, contenu) des sections détectées. Un intitulé sans
+        contenu est conservé comme texte : aucune ligne du CV n'est perdue.
+        """
+        lines = text.splitlines()
+        sections = []
+        current_header, current_lines, in_known_section = "", [], False
+
+        def close_section():
+            if any(l.strip() for l in current_lines):
+                sections.append((current_header, "\n".join(current_lines).strip()))
+            elif current_header:
+                sections.append(("", current_header))
+
+        for i, line in enumerate(lines):
+            previous = lines[i - 1] if i else ""
+            following = next((l for l in lines[i + 1:] if l.strip()), "")
+            if self.is_header(line, previous, following, in_known_section):
+                close_section()
+                current_header, current_lines = line.strip().rstrip(":").strip(), []
+                in_known_section = self.is_known_header(line)
+            else:
+                current_lines.append(line)
+        close_section()
+        return sections
+
+    def _split_oversized(self, paragraph: str) -> List[str]:
+        """Découper un paragraphe trop long en fenêtres de mots avec chevauchement"""
+        words = paragraph.split()
+        word_tokens = [self.count_tokens(w) for w in words]
+        pieces, start = [], 0
+        while start < len(words):
+            end, total = start, 0
+            while end < len(words) and total + word_tokens[end] <= self.chunk_tokens:
+                total += word_tokens[end]
+                end += 1
+            end = max(end, start + 1)
+            pieces.append(" ".join(words[start:end]))
+            if end >= len(words):
+                break
+            # Reculer le début du chunk suivant de `chunk_overlap_tokens` tokens au plus
+            overlap, total = end, 0
+            while overlap > start + 1 and total + word_tokens[overlap - 1] <= self.chunk_overlap_tokens:
+                total += word_tokens[overlap - 1]
+                overlap -= 1
+            start = overlap
+        return pieces
+
+    def split_text(self, text: str) -> List[Tuple[str, str]]:
+        chunks = []
+        for header, body in self.split_sections(text):
+            paragraphs = [p.strip() for p in re.split(r"\n\s*\n", body) if p.strip()]
+            if len(paragraphs) == 1:
+                paragraphs = [l.strip() for l in body.splitlines() if l.strip()]
+
+            budget = self.chunk_tokens - (self.count_tokens(header) if header else 0)
+            current, current_tokens = [], 0
+            for paragraph in paragraphs:
+                tokens = self.count_tokens(paragraph)
+                if tokens > budget:
+                    if current:
+                        chunks.append((header, "\n".join(current)))
+                        current, current_tokens = [], 0
+                    chunks.extend((header, piece) for piece in self._split_oversized(paragraph))
+                    continue
+                if current and current_tokens + tokens > budget:
+                    chunks.append((header, "\n".join(current)))
+                    # Reprendre le dernier paragraphe s'il tient dans le chevauchement
+                    tail = current[-1]
+                    tail_tokens = self.count_tokens(tail)
+                    if tail_tokens <= self.chunk_overlap_tokens and tail_tokens + tokens <= budget:
+                        current, current_tokens = [tail], tail_tokens
+                    else:
+                        current, current_tokens = [], 0
+                current.append(paragraph)
+                current_tokens += tokens
+            if current:
+                chunks.append((header, "\n".join(current)))
+        return chunks
+
+    def split_documents(self, docs: List[Document]) -> List[Document]:
+        # Les PDF sont chargés page par page : on recolle les pages d'un même fichier
+        grouped = {}
+        for doc in docs:
+            source = doc.metadata.get("source", "inconnu")
+            grouped.setdefault(source, []).append(doc)
+
+        chunks = []
+        for source, pages in grouped.items():
+            text = "\n".join(p.page_content for p in pages)
+            base_metadata = {k: v for k, v in pages[0].metadata.items() if k != "page"}
+            for header, content in self.split_text(text):
+                page_content = f"{header}\n{content}" if header else content
+                chunks.append(Document(
+                    page_content=page_content,
+                    metadata={**base_metadata, "section": header or "general"}
+                ))
+        return chunks
+
+
+def load_chunking_config(data_folder=None) -> dict:
+    """
+    Configuration du découpage : valeurs de settings.CHUNKING, surchargées
+    par un fichier chunking.json placé dans le dossier du corpus.
+    """
+    config = dict(settings.CHUNKING)
+    corpus_config = (data_folder or settings.DATA_FOLDER) / "chunking.json"
+    if corpus_config.exists():
+        with open(corpus_config, encoding="utf-8") as f:
+            config.update(json.load(f))
+    return config
+
+
+def get_splitter(config: dict = None):
+    """Instancier le splitter correspondant à la stratégie configurée"""
+    config = config or load_chunking_config()
+    strategy = config.get("strategy", "cv_sections")
+    if strategy == "cv_sections":
+        return CVSectionSplitter(
+            chunk_tokens=config.get("chunk_tokens", 400),
+            chunk_overlap_tokens=config.get("chunk_overlap_tokens", 40),
+            headers=config.get("headers"),
+        )
+    if strategy == "recursive":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=config.get("chunk_size", 200),
+            chunk_overlap=config.get("chunk_overlap", 20),
+        )
+    raise ValueError(f"Stratégie de découpage inconnue : {strategy}")
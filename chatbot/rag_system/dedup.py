@@ -0,0 +1,206 @@
+import os
+import re
+import random
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import xxhash
+from langchain_core.documents import Document
+
+from .chunking import _strip_accents
+
+# Nombre premier de Mersenne utilisé pour les permutations MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Seul ce remplissage peut être indexé une seule fois pour plusieurs CV : sections sans
+# information sur le candidat, ou mentions standard (textes sans accents, en minuscules)
+DEFAULT_BOILERPLATE_SECTIONS = ["references", "mentions legales"]
+DEFAULT_BOILERPLATE_PATTERNS = [
+    r"references? (disponibles? )?sur demande",
+    r"donnees (a caractere )?personnelles",
+    r"\brgpd\b",
+]
+
+
+def normalize_text(text: str) -> str:
+    """Normaliser le texte (minuscules, espaces) avant comparaison"""
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Découper le texte normalisé en n-grammes de mots"""
+    words = normalize_text(text).split(" ")
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class Deduplicator:
+    """
+    Détection des doublons exacts et quasi-doublons par MinHash + LSH.
+
+    Les doublons exacts sont repérés par empreinte xxhash du texte normalisé,
+    les quasi-doublons par similarité de Jaccard estimée sur les signatures MinHash.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(42)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    @staticmethod
+    def fingerprint(text: str) -> str:
+        return xxhash.xxh64_hexdigest(normalize_text(text))
+
+    def signature(self, text: str) -> List[int]:
+        hashes = [xxhash.xxh32_intdigest(s) for s in shingles(text, self.shingle_size)]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        ]
+
+    @staticmethod
+    def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+    def band_keys(self, sig: List[int]) -> List[tuple]:
+        return [
+            (band, tuple(sig[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def find_duplicates(self, texts: List[str], known: Dict = None) -> Dict[int, object]:
+        """
+        Retourne un dictionnaire {index_doublon: canonique}.
+        Le premier texte rencontré d'un groupe est conservé comme canonique.
+
+        `known` ({clé: (empreinte, signature)}) décrit des textes déjà traités, par exemple
+        les documents d'un index existant : un doublon de l'un d'eux a sa clé pour canonique.
+        Les textes conservés y sont ajoutés sous leur index.
+        """
+        known = {} if known is None else known
+        duplicates = {}
+        seen_fingerprints = {}
+        buckets = defaultdict(list)
+        signatures = {}
+        order = {}
+
+        def register(key, fp, sig):
+            seen_fingerprints[fp] = key
+            signatures[key] = sig
+            order[key] = len(order)
+            for band_key in self.band_keys(sig):
+                buckets[band_key].append(key)
+
+        for key, (fp, sig) in list(known.items()):
+            register(key, fp, sig)
+
+        for i, text in enumerate(texts):
+            fp = self.fingerprint(text)
+            if fp in seen_fingerprints:
+                duplicates[i] = seen_fingerprints[fp]
+                continue
+
+            sig = self.signature(text)
+            # Candidats partageant au moins une bande LSH
+            candidates = {j for key in self.band_keys(sig) for j in buckets.get(key, ())}
+            canonical = next(
+                (j for j in sorted(candidates, key=order.get)
+                 if self.similarity(sig, signatures[j]) >= self.threshold),
+                None
+            )
+            if canonical is not None:
+                duplicates[i] = canonical
+                seen_fingerprints[fp] = canonical
+                continue
+
+            register(i, fp, sig)
+            known[i] = (fp, sig)
+
+        return duplicates
+
+    def deduplicate_documents(self, docs: List[Document], known: Dict = None) -> Tuple[List[Document], Dict[str, str]]:
+        """
+        Regrouper les pages par fichier source et écarter les fichiers en double.
+        Retourne les documents conservés et la table d'alias {fichier: fichier canonique}.
+
+        `known` ({nom: (empreinte, signature)}) contient les documents déjà indexés ;
+        les documents conservés y sont ajoutés sous leur nom.
+        """
+        grouped = defaultdict(list)
+        for doc in docs:
+            grouped[doc.metadata.get("source", "inconnu")].append(doc)
+
+        sources = list(grouped)
+        texts = ["\n".join(d.page_content for d in grouped[s]) for s in sources]
+        known = {} if known is None else known
+        duplicates = self.find_duplicates(texts, known)
+
+        names = [grouped[s][0].metadata.get("filename") or os.path.basename(s) for s in sources]
+        aliases = {
+            names[i]: names[j] if isinstance(j, int) else j
+            for i, j in duplicates.items()
+        }
+        aliases = {name: canonical for name, canonical in aliases.items() if name != canonical}
+        for i, name in enumerate(names):
+            if i in known:
+                known[name] = known.pop(i)
+        kept = [doc for i, s in enumerate(sources) if i not in duplicates for doc in grouped[s]]
+        return kept, aliases
+
+    @staticmethod
+    def is_boilerplate(chunk: Document, sections: List[str] = None, patterns: List[str] = None) -> bool:
+        """Chunk d'une section de remplissage (références...) ou contenant une mention standard"""
+        section = normalize_text(_strip_accents(chunk.metadata.get("section", "")))
+        if section in (DEFAULT_BOILERPLATE_SECTIONS if sections is None else sections):
+            return True
+        text = normalize_text(_strip_accents(chunk.page_content))
+        return any(re.search(p, text) for p in (DEFAULT_BOILERPLATE_PATTERNS if patterns is None else patterns))
+
+    def deduplicate_chunks(self, chunks: List[Document], min_documents: int = 10,
+                           boilerplate: Dict = None) -> List[Document]:
+        """
+        Écarter les chunks répétés. Une répétition au sein d'un même CV est toujours écartée ;
+        entre CV différents, seul le remplissage (voir `is_boilerplate`) présent dans au moins
+        `min_documents` CV est gardé une seule fois. Les compétences, diplômes ou employeurs
+        communs à de nombreux candidats restent indexés pour chacun d'eux.
+
+        `boilerplate` ({empreinte: (empreinte, signature)}) contient le remplissage déjà
+        indexé : ses nouvelles occurrences sont écartées et il est complété avec celui trouvé ici.
+        """
+        boilerplate = {} if boilerplate is None else boilerplate
+        known = dict(boilerplate)
+        duplicates = self.find_duplicates([c.page_content for c in chunks], known)
+        groups = defaultdict(list)
+        for i, j in duplicates.items():
+            groups[j].append(i)
+
+        dropped = set()
+        for canonical, members in groups.items():
+            if not isinstance(canonical, int):
+                # Occurrence d'un remplissage déjà indexé (dedup.json)
+                dropped.update(k for k in members if self.is_boilerplate(chunks[k]))
+                continue
+            sources = {chunks[k].metadata.get("source") for k in [canonical] + members}
+            if len(sources) >= min_documents and self.is_boilerplate(chunks[canonical]):
+                dropped.update(members)
+                fp, sig = known[canonical]
+                boilerplate[fp] = (fp, sig)
+                continue
+            seen = {chunks[canonical].metadata.get("source")}
+            for k in members:
+                source = chunks[k].metadata.get("source")
+                if source in seen:
+                    dropped.add(k)
+                seen.add(source)
+        return [c for i, c in enumerate(chunks) if i not in dropped]
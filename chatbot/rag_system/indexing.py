@@ -1,47 +1,209 @@
 from langchain_community.vectorstores import FAISS
 from langchain_community.document_loaders import DirectoryLoader, TextLoader, PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from functools import partial
+from pathlib import Path
+import json
 from django.conf import settings
 from ..config import embeddings
+from ..storage import find_blobs, is_blob
+from .chunking import get_splitter, load_chunking_config
+from .dedup import Deduplicator
+from .metrics import timed
 
 
 class IndexingService:
     @staticmethod
-    def build_vector_store():
+    def load_file(path):
+        """Charger un CV (.txt ou .pdf) ; les autres formats sont ignorés"""
+        path = Path(path)
+        if path.suffix == ".txt":
+            return TextLoader(str(path), encoding="utf-8").load()
+        if path.suffix == ".pdf":
+            return PyPDFLoader(str(path)).load()
+        return []
+
+    @staticmethod
+    def load_documents(data_folder=None, paths=None):
+        """Charger les CV (.txt et .pdf) du dossier de données, ou seulement les fichiers `paths`"""
+        if paths is not None:
+            return [doc for path in paths for doc in IndexingService.load_file(path)]
+
+        data_folder = str(data_folder or settings.DATA_FOLDER)
+        txt_loader = DirectoryLoader(
+            data_folder,
+            glob="**/*.txt",
+            loader_cls=partial(TextLoader, encoding="utf-8")
+        )
+        pdf_loader = DirectoryLoader(
+            data_folder,
+            glob="**/*.pdf",
+            loader_cls=PyPDFLoader
+        )
+        return txt_loader.load() + pdf_loader.load()
+
+    @staticmethod
+    def label_documents(docs, filenames):
+        """
+        Renseigner le nom d'origine des fichiers stockés sous leur empreinte.
+        `filenames` associe chaque empreinte aux noms sous lesquels elle a été uploadée ;
+        les noms supplémentaires sont retournés comme alias du premier. Un fichier stocké
+        absent de `filenames` (uploads supprimés) reste sans nom : voir `named_documents`.
+        """
+        aliases = {}
+        for doc in docs:
+            source = Path(doc.metadata.get("source", ""))
+            names = filenames.get(source.stem)
+            if names:
+                doc.metadata["content_hash"] = source.stem
+                doc.metadata["filename"] = names[0]
+                aliases.update({name: names[0] for name in names[1:] if name != names[0]})
+            elif not is_blob(source):
+                doc.metadata["filename"] = source.name
+        return aliases
+
+    @staticmethod
+    def named_documents(docs):
+        """Écarter les fichiers stockés qui ne correspondent plus à aucun upload"""
+        return [doc for doc in docs if doc.metadata.get("filename")]
+
+    @staticmethod
+    def add_aliases(new_aliases):
+        """Ajouter des entrées {nom de fichier: nom canonique} à la table d'alias de l'index"""
+        aliases_path = settings.FAISS_INDEX_DIR / "aliases.json"
+        aliases = {}
+        if aliases_path.exists():
+            with open(aliases_path, encoding="utf-8") as f:
+                aliases = json.load(f)
+        aliases.update(new_aliases)
+        with open(aliases_path, "w", encoding="utf-8") as f:
+            json.dump(aliases, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def load_dedup_state(incremental=True):
+        """
+        Signatures MinHash des documents déjà indexés et du remplissage (chunks communs)
+        enregistrées avec l'index, pour écarter les doublons lors d'un ajout incrémental
+        """
+        state = {"documents": {}, "boilerplate": {}}
+        state_path = settings.FAISS_INDEX_DIR / "dedup.json"
+        if incremental and state_path.exists():
+            with open(state_path, encoding="utf-8") as f:
+                state.update(json.load(f))
+        return state
+
+    @staticmethod
+    def save_dedup_state(state):
+        with open(settings.FAISS_INDEX_DIR / "dedup.json", "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def remove_documents(content_hashes):
+        """
+        Retirer de l'index les chunks des empreintes données (dernier upload supprimé),
+        ainsi que leurs signatures et alias. Retourne les noms de fichiers écartés comme
+        doublons des documents retirés : leur contenu n'est plus indexé.
+        """
+        index_dir = settings.FAISS_INDEX_DIR
+        if not (index_dir / "index.faiss").exists():
+            return []
+        vectorstore = FAISS.load_local(str(index_dir), embeddings, allow_dangerous_deserialization=True)
+        ids, names = [], set()
+        for docstore_id in vectorstore.index_to_docstore_id.values():
+            doc = vectorstore.docstore.search(docstore_id)
+            if doc.metadata.get("content_hash") in content_hashes:
+                ids.append(docstore_id)
+                names.add(doc.metadata.get("filename"))
+        if not ids:
+            return []
+        vectorstore.delete(ids)
+        vectorstore.save_local(str(index_dir))
+
+        dedup_state = IndexingService.load_dedup_state()
+        for name in names:
+            dedup_state["documents"].pop(name, None)
+        IndexingService.save_dedup_state(dedup_state)
+
+        aliases_path = index_dir / "aliases.json"
+        aliases = {}
+        if aliases_path.exists():
+            with open(aliases_path, encoding="utf-8") as f:
+                aliases = json.load(f)
+        orphaned = sorted(alias for alias, canonical in aliases.items() if canonical in names)
+        aliases = {alias: canonical for alias, canonical in aliases.items() if canonical not in names}
+        with open(aliases_path, "w", encoding="utf-8") as f:
+            json.dump(aliases, f, ensure_ascii=False, indent=2)
+        return orphaned
+
+    @staticmethod
+    def build_vector_store(chunking=None, new_hashes=None, filenames=None):
+        """
+        Construire l'index FAISS.
+
+        Si `new_hashes` est fourni et qu'un index existe déjà, seuls les fichiers
+        correspondant à ces empreintes sont chargés, découpés et ajoutés à l'index.
+        Sinon tout DATA_FOLDER est réindexé : `filenames` doit alors couvrir toutes les empreintes.
+        Dans les deux cas, les doublons sont recherchés aussi parmi les documents déjà indexés.
+        """
         try:
+            index_dir = settings.FAISS_INDEX_DIR
+            incremental = new_hashes is not None and (index_dir / "index.faiss").exists()
+            if incremental and not new_hashes:
+                return True, "Aucun nouveau document à indexer"
+
             # Charger documents
-            txt_loader = DirectoryLoader(
-                str(settings.DATA_FOLDER), 
-                glob="**/*.txt", 
-                loader_cls=partial(TextLoader, encoding="utf-8")
-            )
-            pdf_loader = DirectoryLoader(
-                str(settings.DATA_FOLDER), 
-                glob="**/*.pdf", 
-                loader_cls=PyPDFLoader
-            )
-            
-            docs = txt_loader.load() + pdf_loader.load()
-            
+            with timed("indexing_load", incremental=incremental):
+                paths = find_blobs(new_hashes) if incremental else None
+                docs = IndexingService.load_documents(paths=paths)
+                aliases = IndexingService.label_documents(docs, filenames or {})
+                docs = IndexingService.named_documents(docs)
+
             if not docs:
                 raise Exception("Aucun document trouvé à indexer")
-            
-            # Split documents
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=200, 
-                chunk_overlap=20
+
+            # Écarter les CV en double (même contenu sous un autre nom)
+            doc_dedup = Deduplicator(threshold=settings.DEDUP_DOCUMENT_THRESHOLD)
+            dedup_state = IndexingService.load_dedup_state(incremental)
+            with timed("indexing_dedup_documents"):
+                docs, duplicate_aliases = doc_dedup.deduplicate_documents(docs, dedup_state["documents"])
+                aliases.update(duplicate_aliases)
+
+            # Split documents (stratégie configurable par corpus, cf. settings.CHUNKING)
+            splitter = get_splitter(chunking or load_chunking_config())
+            with timed("indexing_split"):
+                chunks = splitter.split_documents(docs)
+
+            # Écarter les chunks répétés (adresses, mentions standard...) avant l'embedding
+            chunk_dedup = Deduplicator(threshold=settings.DEDUP_CHUNK_THRESHOLD)
+            total_chunks = len(chunks)
+            with timed("indexing_dedup_chunks"):
+                chunks = chunk_dedup.deduplicate_chunks(
+                    chunks, min_documents=settings.DEDUP_BOILERPLATE_MIN_DOCUMENTS,
+                    boilerplate=dedup_state["boilerplate"],
+                )
+
+            # Créer l'index FAISS, ou compléter l'index existant avec les nouveaux chunks
+            with timed("indexing_embed", chunks=len(chunks)):
+                if incremental:
+                    vectorstore = FAISS.load_local(str(index_dir), embeddings, allow_dangerous_deserialization=True)
+                    if chunks:
+                        vectorstore.add_documents(chunks)
+                else:
+                    vectorstore = FAISS.from_documents(chunks, embeddings)
+            with timed("indexing_save"):
+                vectorstore.save_local(str(index_dir))
+                IndexingService.save_dedup_state(dedup_state)
+
+            # Table d'alias : chaque nom de fichier d'origine reste résolvable
+            if incremental:
+                IndexingService.add_aliases(aliases)
+            else:
+                with open(index_dir / "aliases.json", "w", encoding="utf-8") as f:
+                    json.dump(aliases, f, ensure_ascii=False, indent=2)
+
+            return True, (
+                f"Indexation terminée avec succès : {len(chunks)} chunks ajoutés "
+                f"({len(duplicate_aliases)} CV en double, {total_chunks - len(chunks)} chunks redondants écartés)"
             )
-            chunks = splitter.split_documents(docs)
-            
-            # Créer l'index FAISS
-            vectorstore = FAISS.from_documents(chunks, embeddings)
-            vectorstore.save_local(str(settings.FAISS_INDEX_DIR))
-            
-            return True, "Indexation terminée avec succès"
-            
+
         except Exception as e:
             return False, f"Erreur lors de l'indexation : {str(e)}"
-
-
-            
\ No newline at end of file
@@ -1,6 +1,7 @@
 # rag_app/services/llm_service.py
 import os
 import re
+import json
 from collections import defaultdict
 from typing import List, Tuple, TypedDict
 from django.conf import settings
@@ -8,25 +9,57 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from ..config import embeddings, openai_api_key
+from ..config import embeddings, openai_api_key, openai_base_url
+from .metrics import record_llm_usage, timed
 
 class State(TypedDict):
     question: str
     context: List[Tuple[Document, float]]
     results: List[dict]
     conversation_context: List[dict]  
+def parse_verdict(text: str):
+    """Extraire note, décision et justification de la réponse au format imposé par le prompt"""
+    match = re.search(r"NOTE\s*:\s*(\d+)", text)
+    score_llm = min(int(match.group(1)), 10) if match else 0
+    match = re.search(r"D[ée]cision\s*:\s*\**\s*À\s+(conserver|écarter)", text, re.IGNORECASE)
+    decision = {"conserver": "keep", "écarter": "reject"}.get(match.group(1).lower(), "") if match else ""
+    match = re.search(r"Justification\s*:\s*(.+)", text, re.IGNORECASE | re.DOTALL)
+    justification = match.group(1).strip() if match else text.strip()
+    return score_llm, decision, justification
+
 class LLMService:
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4o", api_key=openai_api_key)
+        self.llm = ChatOpenAI(model="gpt-4o", api_key=openai_api_key, base_url=openai_base_url)
         self.vector_store = None
         self.graph = None
+        self.aliases = {}
         self.build_graph()
     
+    def load_aliases(self):
+        """Charger la table d'alias des CV dédupliqués à l'indexation"""
+        aliases_path = settings.FAISS_INDEX_DIR / "aliases.json"
+        if aliases_path.exists():
+            with open(aliases_path, encoding="utf-8") as f:
+                self.aliases = json.load(f)
+        else:
+            self.aliases = {}
+    
+    def resolve_filename(self, filename: str) -> str:
+        """Retrouver le fichier indexé correspondant à un nom de fichier d'origine"""
+        return self.aliases.get(filename, filename)
+    
+    def get_aliases(self, filename: str) -> List[str]:
+        """Lister les fichiers écartés comme doublons de ce fichier"""
+        return sorted(alias for alias, canonical in self.aliases.items() if canonical == filename)
+    
     def merge_context_by_file(self, context: List[Tuple[Document, float]]):
         grouped = defaultdict(list)
+        filenames = {}
         for doc, score in context:
             source = doc.metadata.get("source", "inconnu")
             grouped[source].append((doc.page_content, score))
+            # Nom d'origine du fichier (les uploads sont stockés sous leur empreinte)
+            filenames.setdefault(source, doc.metadata.get("filename") or os.path.basename(source))
         
         merged = []
         for filepath, entries in grouped.items():
@@ -34,7 +67,7 @@ class LLMService:
             scores = [e[1] for e in entries]
             full_content = "\n".join(contents)
             avg_score = sum(scores) / len(scores)
-            filename = os.path.basename(filepath)
+            filename = filenames[filepath]
             merged.append((filepath, filename, full_content, avg_score))
         
         return merged
@@ -60,16 +93,21 @@ class LLMService:
                 embeddings, 
                 allow_dangerous_deserialization=True
             )
+            self.load_aliases()
             
             def retrieve(state: State):
-                docs_with_scores = self.vector_store.similarity_search_with_score(
-                    state["question"], k=10
-                )
+                with timed("query_embedding"):
+                    query_vector = embeddings.embed_query(state["question"])
+                with timed("faiss_search", k=10):
+                    docs_with_scores = self.vector_store.similarity_search_with_score_by_vector(
+                        query_vector, k=10
+                    )
                 return {"context": docs_with_scores}
             
             def generate(state: State):
                 filtered = []
-                merged_context = self.merge_context_by_file(state["context"])
+                with timed("merge_context", chunks=len(state["context"])):
+                    merged_context = self.merge_context_by_file(state["context"])
                 
 
                 
@@ -101,20 +139,25 @@ class LLMService:
                     {content}
                     """
                     
-                    response = self.llm.invoke([
-                        {"role": "system", "content": "Tu es un assistant RH."},
-                        {"role": "user", "content": prompt}
-                    ])
+                    with timed("llm_call", file=filename) as span:
+                        response = self.llm.invoke([
+                            {"role": "system", "content": "Tu es un assistant RH."},
+                            {"role": "user", "content": prompt}
+                        ])
+                        usage = record_llm_usage(response, model="gpt-4o")
+                        span["prompt_tokens"] = usage.get("input_tokens", 0)
+                        span["completion_tokens"] = usage.get("output_tokens", 0)
                     
-                    match = re.search(r"NOTE\s*:\s*(\d+)", response.content)
-                    score_llm = int(match.group(1)) if match else 0
+                    score_llm, decision, justification = parse_verdict(response.content)
                     
                     filtered.append({
                         "score_faiss": round(float(score_faiss), 3),
                         "score_llm": score_llm,
-                        "justification": response.content.strip(),
+                        "decision": decision,
+                        "justification": justification,
                         "filename": filename,
                         "filepath": filepath,
+                        "aliases": self.get_aliases(filename),
                     })
                 
                 filtered = sorted(filtered, key=lambda x: x["score_llm"], reverse=True)
@@ -129,6 +172,7 @@ class LLMService:
         else:
             self.vector_store = None
             self.graph = None
+            self.aliases = {}
     
     def ask_question(self, question: str, conversation_context: List[dict] = None):
         """
@@ -149,7 +193,8 @@ class LLMService:
                 "question": question,
                 "conversation_context": conversation_context or []
             }
-            result = self.graph.invoke(state)
+            with timed("ask_question"):
+                result = self.graph.invoke(state)
             return result.get("results", []), None
         except Exception as e:
             return None, f"Erreur lors du traitement : {str(e)}"
@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import httpx
+
+from .benchmark import DEFAULT_QUERIES, generate_cv, percentile
+
+
+@dataclass
+class LoadTestConfig:
+    base_url: str = "http://127.0.0.1:8000"
+    users: int = 20
+    messages_per_user: int = 5
+    cvs_per_upload: int = 5
+    # Part des utilisateurs qui uploadent puis relancent l'indexation
+    upload_ratio: float = 0.2
+    think_time: float = 0.5
+    timeout: float = 120.0
+    seed: int = 0
+
+
+class LoadTestRecorder:
+    """Collecte thread-safe des latences et erreurs par endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, endpoint: str, duration: float, ok: bool):
+        with self._lock:
+            self.latencies[endpoint].append(duration)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        report = {"elapsed_seconds": round(elapsed, 3), "endpoints": {}}
+        for endpoint, values in sorted(self.latencies.items()):
+            report["endpoints"][endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(values), 4),
+                "throughput_rps": round(len(values) / elapsed, 3) if elapsed else 0,
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "p99": round(percentile(values, 99), 4),
+                "max": round(max(values), 4),
+            }
+        return report
+
+
+def _timed_request(recorder, endpoint, send):
+    start = time.perf_counter()
+    try:
+        response = send()
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        response, ok = None, False
+    recorder.record(endpoint, time.perf_counter() - start, ok)
+    return response
+
+
+def simulate_user(user_id: int, config: LoadTestConfig, recorder: LoadTestRecorder):
+    """Un utilisateur simulé : upload et indexation éventuels, puis une conversation"""
+    rng = random.Random(config.seed + user_id)
+    # Un client par utilisateur : cookies de session (utilisateur anonyme) séparés
+    with httpx.Client(base_url=config.base_url, timeout=config.timeout) as client:
+        if rng.random() < config.upload_ratio:
+            files = [
+                ("files", (f"cv_user{user_id}_{i}.txt", generate_cv(rng).encode("utf-8"), "text/plain"))
+                for i in range(config.cvs_per_upload)
+            ]
+            _timed_request(recorder, "upload_cvs", lambda: client.post("/upload/", files=files))
+            _timed_request(recorder, "index_cvs", lambda: client.get("/index/"))
+
+        conversation_id = None
+        for _ in range(config.messages_per_user):
+            time.sleep(rng.uniform(0, 2 * config.think_time))
+            body = {"message": rng.choice(DEFAULT_QUERIES), "conversation_id": conversation_id}
+            response = _timed_request(recorder, "send_message", lambda: client.post("/send-message/", json=body))
+            if response is not None and response.status_code == 200:
+                conversation_id = response.json().get("conversation_id")
+
+
+def run_load_test(config: LoadTestConfig) -> dict:
+    recorder = LoadTestRecorder()
+    with ThreadPoolExecutor(max_workers=config.users) as pool:
+        futures = [pool.submit(simulate_user, i, config, recorder) for i in range(config.users)]
+        for future in futures:
+            future.result()
+    recorder.finished = time.perf_counter()
+    report = recorder.summary()
+    report["config"] = config.__dict__
+    return report
@@ -0,0 +1,75 @@
+import math
+import random
+import re
+import time
+from typing import List
+
+import xxhash
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeddings locaux et déterministes (sac de mots haché), sans appel réseau.
+    Utilisés pour les comparaisons et benchmarks hors ligne à la place d'OpenAI.
+    """
+
+    def __init__(self, dimension: int = 256, latency: float = 0.0):
+        self.dimension = dimension
+        # Latence simulée (en secondes) par appel, comme un aller-retour vers l'API
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for word in _WORD_PATTERN.findall(text.lower()):
+            h = xxhash.xxh64_intdigest(word)
+            vector[h % self.dimension] += 1.0 if (h >> 63) else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+
+class FakeChatModel:
+    """
+    Remplaçant déterministe de ChatOpenAI : renvoie une évaluation au format attendu
+    par LLMService, avec une note dérivée du contenu du prompt.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+        prompt = messages[-1]["content"] if isinstance(messages[-1], dict) else str(messages[-1])
+        score = xxhash.xxh32_intdigest(prompt) % 11
+        decision = "À conserver" if score >= 6 else "À écarter"
+        content = (
+            f"NOTE: {score}/10 — Décision : {decision}\n"
+            f"Justification : évaluation simulée pour les benchmarks hors ligne."
+        )
+        # Comptage approximatif des tokens, au format `usage_metadata` de ChatOpenAI
+        input_tokens = sum(len(_WORD_PATTERN.findall(str(m.get("content", "") if isinstance(m, dict) else m)))
+                           for m in messages)
+        output_tokens = len(_WORD_PATTERN.findall(content))
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
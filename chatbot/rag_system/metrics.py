@@ -0,0 +1,154 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+trace_logger = logging.getLogger("chatbot.trace")
+
+# Bornes des histogrammes de durée (secondes), des appels FAISS (ms) aux appels LLM (s)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current_trace = contextvars.ContextVar("rag_trace_id", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._series[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_duration = registry.register(Histogram(
+    "rag_stage_duration_seconds", "Durée de chaque étape du pipeline RAG"
+))
+llm_calls = registry.register(Counter(
+    "rag_llm_calls_total", "Nombre d'appels au LLM"
+))
+llm_tokens = registry.register(Counter(
+    "rag_llm_tokens_total", "Tokens consommés par les appels LLM (prompt / completion)"
+))
+stage_errors = registry.register(Counter(
+    "rag_stage_errors_total", "Étapes du pipeline terminées par une exception"
+))
+
+
+@contextmanager
+def start_trace(name: str):
+    """Ouvrir une trace (une requête) : les spans émis dedans partagent son identifiant"""
+    token = _current_trace.set(uuid.uuid4().hex[:16])
+    try:
+        with timed(name):
+            yield _current_trace.get()
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def timed(stage: str, **attributes):
+    """
+    Mesurer la durée d'une étape dans l'histogramme `rag_stage_duration_seconds`.
+    Si settings.RAG_TRACE_SPANS est actif, chaque étape est aussi journalisée comme span.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attributes
+    except Exception:
+        status = "error"
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        stage_duration.observe(duration, stage=stage)
+        if settings.RAG_TRACE_SPANS:
+            extra = " ".join(f"{k}={v}" for k, v in attributes.items())
+            trace_logger.info(
+                "trace=%s span=%s status=%s duration_ms=%.2f %s",
+                _current_trace.get() or "-", stage, status, duration * 1000, extra
+            )
+
+
+def record_llm_usage(response, model: str = ""):
+    """Comptabiliser un appel LLM et ses tokens à partir de `usage_metadata`"""
+    llm_calls.inc(model=model)
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        llm_tokens.inc(usage.get("input_tokens", 0), model=model, kind="prompt")
+        llm_tokens.inc(usage.get("output_tokens", 0), model=model, kind="completion")
+    return usage
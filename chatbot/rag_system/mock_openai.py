@@ -0,0 +1,190 @@
+import array
+import base64
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .local_models import FakeChatModel, HashingEmbeddings
+
+
+@dataclass
+class MockOpenAIConfig:
+    """Comportement simulé du serveur : latences, taux d'erreur et limitation de débit"""
+    chat_latency: float = 0.8
+    embedding_latency: float = 0.05
+    # 'fixed', 'uniform' (± jitter) ou 'lognormal' (moyenne = latence, sigma = jitter)
+    latency_distribution: str = "lognormal"
+    jitter: float = 0.3
+    error_rate: float = 0.0
+    # Requêtes par seconde autorisées (0 = illimité), au-delà : HTTP 429
+    rate_limit: float = 0.0
+    burst: int = 10
+    embedding_dimension: int = 3072
+    seed: int = 0
+    verbose: bool = False
+
+    def sample_latency(self, mean: float, rng: random.Random) -> float:
+        if mean <= 0:
+            return 0.0
+        if self.latency_distribution == "fixed":
+            return mean
+        if self.latency_distribution == "uniform":
+            return max(0.0, rng.uniform(mean - self.jitter, mean + self.jitter))
+        if self.latency_distribution == "lognormal":
+            # mu choisi pour que l'espérance de la loi log-normale soit égale à `mean`
+            sigma = self.jitter
+            return rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        raise ValueError(f"Distribution de latence inconnue : {self.latency_distribution}")
+
+
+@dataclass
+class MockOpenAIStats:
+    requests: int = 0
+    throttled: int = 0
+    errors: int = 0
+    by_endpoint: dict = field(default_factory=dict)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.config.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, error_type: str, headers: dict = None):
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": None}}, headers)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.endswith("/chat/completions"):
+            endpoint, handler, mean = "chat", self.chat_completions, server.config.chat_latency
+        elif self.path.endswith("/embeddings"):
+            endpoint, handler, mean = "embeddings", self.embeddings, server.config.embedding_latency
+        else:
+            return self._send_error(404, f"Route inconnue : {self.path}", "invalid_request_error")
+
+        with server.lock:
+            server.stats.requests += 1
+            server.stats.by_endpoint[endpoint] = server.stats.by_endpoint.get(endpoint, 0) + 1
+            latency = server.config.sample_latency(mean, server.rng)
+            fail = server.rng.random() < server.config.error_rate
+
+        if server.bucket and not server.bucket.try_acquire():
+            with server.lock:
+                server.stats.throttled += 1
+            return self._send_error(429, "Rate limit reached (mock)", "rate_limit_exceeded",
+                                    {"Retry-After": "1"})
+
+        time.sleep(latency)
+        if fail:
+            with server.lock:
+                server.stats.errors += 1
+            return self._send_error(500, "Erreur simulée du serveur (mock)", "server_error")
+
+        self._send_json(200, handler(payload))
+
+    def chat_completions(self, payload: dict) -> dict:
+        response = self.server.chat_model.invoke(payload.get("messages", []))
+        usage = response.usage_metadata
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": response.content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": usage["input_tokens"],
+                "completion_tokens": usage["output_tokens"],
+                "total_tokens": usage["total_tokens"],
+            },
+        }
+
+    def embeddings(self, payload: dict) -> dict:
+        inputs = payload.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        # Les entrées peuvent être des textes ou des listes d'identifiants de tokens
+        texts = [t if isinstance(t, str) else " ".join(f"t{i}" for i in t) for t in inputs]
+
+        dimension = payload.get("dimensions") or self.server.config.embedding_dimension
+        model = HashingEmbeddings(dimension=dimension)
+        data = []
+        for i, vector in enumerate(model.embed_documents(texts)):
+            if payload.get("encoding_format") == "base64":
+                vector = base64.b64encode(array.array("f", vector).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+
+        tokens = sum(len(t.split()) for t in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "text-embedding-3-large"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Serveur HTTP compatible avec les routes chat/completions et embeddings de l'API OpenAI"""
+    daemon_threads = True
+
+    def __init__(self, address, config: MockOpenAIConfig = None):
+        super().__init__(address, MockOpenAIHandler)
+        self.config = config or MockOpenAIConfig()
+        self.stats = MockOpenAIStats()
+        self.lock = threading.Lock()
+        self.rng = random.Random(self.config.seed)
+        self.bucket = TokenBucket(self.config.rate_limit, self.config.burst) if self.config.rate_limit else None
+        # La latence est simulée par le serveur, pas par le modèle
+        self.chat_model = FakeChatModel()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
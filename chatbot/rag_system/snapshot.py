@@ -0,0 +1,226 @@
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+import tarfile
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import faiss
+import zstandard
+from django.conf import settings
+
+from ..config import embeddings
+from .benchmark import current_commit
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+_CHUNK_SIZE = 1024 * 1024
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def inspect_index(directory: Path) -> int:
+    """
+    Vérifier qu'un dossier contient un index FAISS cohérent avec son docstore
+    et retourner le nombre de vecteurs.
+    """
+    directory = Path(directory)
+    if not (directory / "index.faiss").exists() or not (directory / "index.pkl").exists():
+        raise SnapshotError(f"Index FAISS introuvable dans {directory}")
+    vectors = faiss.read_index(str(directory / "index.faiss")).ntotal
+    with open(directory / "index.pkl", "rb") as f:
+        _docstore, index_to_docstore_id = pickle.load(f)
+    if len(index_to_docstore_id) != vectors:
+        raise SnapshotError(
+            f"Index incohérent : {vectors} vecteurs pour {len(index_to_docstore_id)} entrées du docstore"
+        )
+    return vectors
+
+
+def _file_states(directory: Path) -> dict:
+    return {
+        p.name: (p.stat().st_size, p.stat().st_mtime_ns)
+        for p in sorted(directory.iterdir()) if p.is_file()
+    }
+
+
+def _stage_index(index_dir: Path, staging: Path, attempts: int = 3) -> dict:
+    """
+    Copier l'index dans `staging` sans bloquer l'indexation. Si un fichier est modifié
+    pendant la copie (indexation en cours), la copie est recommencée.
+    """
+    for _ in range(attempts):
+        before = _file_states(index_dir)
+        for name in before:
+            shutil.copy2(index_dir / name, staging / name)
+        if _file_states(index_dir) == before:
+            return before
+        for p in staging.iterdir():
+            p.unlink()
+        time.sleep(0.5)
+    raise SnapshotError("L'index a été modifié pendant l'export ; réessayez une fois l'indexation terminée")
+
+
+def export_snapshot(output: Path, index_dir: Path = None, level: int = 10) -> dict:
+    """
+    Exporter l'index FAISS (index, docstore, table d'alias) dans une archive tar
+    compressée avec zstd, précédée d'un manifeste listant l'empreinte SHA-256 de
+    chaque fichier. L'empreinte de l'archive est écrite à côté dans `<archive>.sha256`.
+    """
+    index_dir = Path(index_dir or settings.FAISS_INDEX_DIR)
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix="snapshot-") as tmp:
+        staging = Path(tmp)
+        _stage_index(index_dir, staging)
+        vectors = inspect_index(staging)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": current_commit(),
+            "embedding_model": getattr(embeddings, "model", None),
+            "vectors": vectors,
+            "files": {
+                p.name: {"size": p.stat().st_size, "sha256": sha256_file(p)}
+                for p in sorted(staging.iterdir())
+            },
+        }
+        manifest_bytes = json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8")
+
+        # Écriture dans un fichier temporaire puis renommage : pas d'archive partielle visible
+        partial = output.with_name(f".{output.name}.partial")
+        compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+        with open(partial, "wb") as raw, compressor.stream_writer(raw) as writer, \
+                tarfile.open(fileobj=writer, mode="w|") as tar:
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(manifest_bytes)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(manifest_bytes))
+            for name in manifest["files"]:
+                tar.add(staging / name, arcname=name, recursive=False)
+        os.replace(partial, output)
+
+    checksum = sha256_file(output)
+    with open(output.with_name(output.name + ".sha256"), "w", encoding="utf-8") as f:
+        f.write(f"{checksum}  {output.name}\n")
+
+    manifest["archive"] = {"path": str(output), "size": output.stat().st_size, "sha256": checksum}
+    return manifest
+
+
+def read_checksum_file(archive: Path):
+    checksum_path = Path(archive).with_name(Path(archive).name + ".sha256")
+    if not checksum_path.exists():
+        return None
+    return checksum_path.read_text(encoding="utf-8").split()[0]
+
+
+def _extract_verified(archive: Path, staging: Path) -> dict:
+    """Décompresser l'archive en flux dans `staging` en vérifiant chaque fichier"""
+    with open(archive, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as reader, \
+            tarfile.open(fileobj=reader, mode="r|") as tar:
+        manifest = None
+        for member in tar:
+            if manifest is None:
+                if member.name != MANIFEST_NAME:
+                    raise SnapshotError("Archive invalide : le manifeste doit être le premier fichier")
+                manifest = json.load(tar.extractfile(member))
+                if manifest.get("format") != SNAPSHOT_FORMAT:
+                    raise SnapshotError(f"Format de snapshot non pris en charge : {manifest.get('format')}")
+                continue
+
+            expected = manifest["files"].get(member.name)
+            # Uniquement des fichiers à plat, listés dans le manifeste (pas de chemins ni de liens)
+            if not member.isfile() or expected is None or Path(member.name).name != member.name:
+                raise SnapshotError(f"Entrée inattendue dans l'archive : {member.name}")
+            digest = hashlib.sha256()
+            source = tar.extractfile(member)
+            with open(staging / member.name, "wb") as f:
+                for chunk in iter(lambda: source.read(_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+            if digest.hexdigest() != expected["sha256"]:
+                raise SnapshotError(f"Empreinte SHA-256 invalide pour {member.name}")
+
+    if manifest is None:
+        raise SnapshotError("Archive vide")
+    missing = set(manifest["files"]) - {p.name for p in staging.iterdir()}
+    if missing:
+        raise SnapshotError(f"Fichiers manquants dans l'archive : {', '.join(sorted(missing))}")
+    return manifest
+
+
+def _directory_mode(path: Path) -> int:
+    if path.exists():
+        return path.stat().st_mode & 0o7777
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o777 & ~umask
+
+
+def import_snapshot(archive: Path, index_dir: Path = None, checksum: str = None, force: bool = False) -> dict:
+    """
+    Importer une archive produite par `export_snapshot`. Tout est vérifié dans un
+    dossier temporaire (empreinte de l'archive, de chaque fichier, cohérence de
+    l'index) avant de remplacer l'index existant par renommage.
+    """
+    archive = Path(archive)
+    index_dir = Path(index_dir or settings.FAISS_INDEX_DIR)
+    if (index_dir / "index.faiss").exists() and not force:
+        raise SnapshotError(f"Un index existe déjà dans {index_dir} (utilisez --force pour le remplacer)")
+
+    expected = checksum or read_checksum_file(archive)
+    if expected is None:
+        raise SnapshotError(f"Empreinte de l'archive introuvable ({archive.name}.sha256 ou --checksum)")
+    if sha256_file(archive) != expected:
+        raise SnapshotError("Empreinte SHA-256 de l'archive invalide")
+
+    index_dir.parent.mkdir(parents=True, exist_ok=True)
+    # Dossier temporaire sur le même système de fichiers : le renommage final est atomique
+    staging = Path(tempfile.mkdtemp(prefix=f".{index_dir.name}.import-", dir=index_dir.parent))
+    try:
+        try:
+            manifest = _extract_verified(archive, staging)
+        except (zstandard.ZstdError, tarfile.TarError, ValueError) as e:
+            raise SnapshotError(f"Archive illisible : {e}") from e
+        vectors = inspect_index(staging)
+        if vectors != manifest["vectors"]:
+            raise SnapshotError(f"Nombre de vecteurs inattendu : {vectors} au lieu de {manifest['vectors']}")
+
+        # mkdtemp crée le dossier en 0700 : reprendre les droits de l'index remplacé
+        # (ou ceux d'un dossier créé normalement) pour que l'application puisse le lire
+        os.chmod(staging, _directory_mode(index_dir))
+        backup = None
+        if index_dir.exists():
+            backup = index_dir.with_name(f".{index_dir.name}.old-{os.getpid()}")
+            os.replace(index_dir, backup)
+        try:
+            os.replace(staging, index_dir)
+        except OSError:
+            if backup is not None:
+                os.replace(backup, index_dir)
+            raise
+        if backup is not None:
+            shutil.rmtree(backup, ignore_errors=True)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    manifest["embedding_model_matches"] = manifest.get("embedding_model") == getattr(embeddings, "model", None)
+    return manifest
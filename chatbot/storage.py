@@ -0,0 +1,80 @@
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def blob_path(content_hash: str, extension: str, data_folder: Path = None) -> Path:
+    """Chemin d'un fichier adressé par son contenu : <DATA_FOLDER>/<2 premiers car.>/<sha256><ext>"""
+    data_folder = Path(data_folder or settings.DATA_FOLDER)
+    return data_folder / content_hash[:2] / f"{content_hash}{extension}"
+
+
+def store_upload(uploaded_file, data_folder: Path = None):
+    """
+    Écrire un fichier uploadé sur disque par morceaux tout en calculant son SHA-256,
+    puis le ranger sous son empreinte. Un contenu déjà présent n'est pas réécrit.
+
+    Retourne (empreinte, taille, chemin, nouveau contenu ?).
+    """
+    data_folder = Path(data_folder or settings.DATA_FOLDER)
+    extension = Path(uploaded_file.name).suffix.lower()
+    tmp_dir = data_folder / 'tmp'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+            tmp.write(chunk)
+
+    content_hash = digest.hexdigest()
+    path = blob_path(content_hash, extension, data_folder)
+    if path.exists():
+        os.remove(tmp.name)
+        return content_hash, size, path, False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Renommage atomique : un fichier n'est jamais visible à moitié écrit par l'indexeur
+    os.replace(tmp.name, path)
+    return content_hash, size, path, True
+
+
+def find_blobs(content_hashes, data_folder: Path = None):
+    """Chemins des fichiers stockés pour les empreintes données"""
+    data_folder = Path(data_folder or settings.DATA_FOLDER)
+    paths = []
+    for content_hash in sorted(content_hashes):
+        paths.extend(sorted((data_folder / content_hash[:2]).glob(f"{content_hash}.*")))
+    return paths
+
+
+def is_blob(path) -> bool:
+    """Fichier rangé sous son empreinte par `store_upload`"""
+    path = Path(path)
+    return bool(_HASH_PATTERN.fullmatch(path.stem)) and path.parent.name == path.stem[:2]
+
+
+def delete_blobs(content_hashes, data_folder: Path = None):
+    """Supprimer les fichiers stockés pour les empreintes données"""
+    for path in find_blobs(content_hashes, data_folder):
+        path.unlink(missing_ok=True)
+
+
+def filenames_by_hash(uploads):
+    """
+    Noms d'origine de chaque empreinte, dans l'ordre d'upload : {empreinte: [noms]}.
+    `uploads` est un queryset de DocumentUpload.
+    """
+    filenames = {}
+    for content_hash, filename in uploads.order_by('upload_date', 'id').values_list('content_hash', 'filename'):
+        names = filenames.setdefault(content_hash, [])
+        if filename not in names:
+            names.append(filename)
+    return filenames
@@ -1,3 +1,781 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from .models import Conversation, DocumentUpload, Message, ScreeningResult
+from .admin import EstimatedCountPaginator, ScoreRangeFilter
+from .pagination import encode_cursor
+from .rag_system.benchmark import compare_results, local_models, percentile, run_benchmark
+from .rag_system.chunking import CVSectionSplitter, get_splitter
+from .rag_system.dedup import Deduplicator
+from .rag_system.indexing import IndexingService
+from .rag_system.llm_processing import llm_service, parse_verdict
+from .rag_system.local_models import HashingEmbeddings
+from .rag_system.mock_openai import MockOpenAIConfig, MockOpenAIServer
+from .rag_system.load_test import LoadTestRecorder
+from .rag_system.metrics import Histogram, registry, timed
+from .rag_system.snapshot import SnapshotError, export_snapshot, import_snapshot
+
+
+CV_TEXT = (
+    "Jean Dupont développeur Python senior avec huit ans d'expérience en Django, "
+    "FastAPI et PostgreSQL. Conception d'API REST, mise en place de pipelines CI/CD "
+    "et encadrement d'une équipe de quatre développeurs au sein d'une startup fintech."
+)
+
+
+class DeduplicatorTests(SimpleTestCase):
+    def test_exact_duplicates_ignore_case_and_whitespace(self):
+        dedup = Deduplicator()
+        duplicates = dedup.find_duplicates([CV_TEXT, "  " + CV_TEXT.upper(), "Autre profil"])
+        self.assertEqual(duplicates, {1: 0})
+
+    def test_near_duplicates_are_detected(self):
+        dedup = Deduplicator(threshold=0.7)
+        near = CV_TEXT.replace("startup fintech", "startup fintech parisienne")
+        self.assertEqual(dedup.find_duplicates([CV_TEXT, near]), {1: 0})
+
+    def test_distinct_texts_are_kept(self):
+        dedup = Deduplicator()
+        other = "Marie Martin data scientist spécialisée en vision par ordinateur et PyTorch."
+        self.assertEqual(dedup.find_duplicates([CV_TEXT, other]), {})
+
+    def test_deduplicate_documents_builds_alias_map(self):
+        docs = [
+            Document(page_content=CV_TEXT, metadata={"source": "/data/cv_jean.pdf"}),
+            Document(page_content=CV_TEXT, metadata={"source": "/data/cv_jean_v2.pdf"}),
+            Document(page_content="Marie Martin data scientist", metadata={"source": "/data/cv_marie.txt"}),
+        ]
+        kept, aliases = Deduplicator().deduplicate_documents(docs)
+        self.assertEqual([d.metadata["source"] for d in kept], ["/data/cv_jean.pdf", "/data/cv_marie.txt"])
+        self.assertEqual(aliases, {"cv_jean_v2.pdf": "cv_jean.pdf"})
+
+    def test_known_documents_are_matched(self):
+        dedup = Deduplicator()
+        known = {}
+        dedup.deduplicate_documents([Document(page_content=CV_TEXT, metadata={"source": "cv_jean.pdf"})], known)
+        self.assertEqual(list(known), ["cv_jean.pdf"])
+
+        # Signatures relues depuis le JSON de l'index : listes au lieu de tuples
+        known = json.loads(json.dumps(known))
+        kept, aliases = dedup.deduplicate_documents([
+            Document(page_content=CV_TEXT + " Disponible immédiatement.", metadata={"source": "cv_jean_v2.pdf"}),
+            Document(page_content="Marie Curie chimiste", metadata={"source": "cv_marie.pdf"}),
+        ], known)
+        self.assertEqual(aliases, {"cv_jean_v2.pdf": "cv_jean.pdf"})
+        self.assertEqual([d.metadata["source"] for d in kept], ["cv_marie.pdf"])
+        self.assertEqual(sorted(known), ["cv_jean.pdf", "cv_marie.pdf"])
+
+    def test_deduplicate_chunks_drops_boilerplate_only(self):
+        boilerplate = "Références disponibles sur demande. 12 rue de la Paix, 75002 Paris."
+        education = "Formation\nMaster, EPITA (2009)"
+        chunks = [Document(page_content=boilerplate, metadata={"source": f"cv_{i}.txt"}) for i in range(3)]
+        chunks += [Document(page_content=education, metadata={"source": f"cv_{i}.txt"}) for i in range(2)]
+        chunks.append(Document(page_content=education, metadata={"source": "cv_0.txt"}))
+
+        kept = Deduplicator().deduplicate_chunks(chunks, min_documents=3)
+        by_text = defaultdict(list)
+        for c in kept:
+            by_text[c.page_content].append(c.metadata["source"])
+        # Le texte commun à 3 CV est gardé une fois ; la formation partagée par 2 CV reste à chacun
+        self.assertEqual(by_text[boilerplate], ["cv_0.txt"])
+        self.assertEqual(by_text[education], ["cv_0.txt", "cv_1.txt"])
+
+    def test_shared_skills_are_kept_for_every_cv(self):
+        docs = [
+            Document(page_content=f"Candidat {i}\n\nCompétences\nPython, Django, PostgreSQL, Docker\n\n"
+                                  f"Références\nRéférences disponibles sur demande.",
+                     metadata={"source": f"cv{i}.txt"})
+            for i in range(12)
+        ]
+        chunks = CVSectionSplitter().split_documents(docs)
+        kept = Deduplicator(threshold=0.85).deduplicate_chunks(chunks, min_documents=10)
+        with_skills = {c.metadata["source"] for c in kept if "Python" in c.page_content}
+        references = [c for c in kept if c.metadata["section"] == "Références"]
+        self.assertEqual(len(with_skills), 12)
+        self.assertEqual(len(references), 1)
+
+
+SAMPLE_CV = """Jean Dupont
+Développeur Python
+
+EXPÉRIENCE PROFESSIONNELLE
+Lead développeur chez Fintech SA (2019-2024)
+Conception d'API REST avec Django et PostgreSQL.
+
+Développeur chez WebAgency (2016-2019)
+Sites e-commerce et intégrations de paiement.
+
+Formation
+Master informatique, Université de Lyon (2016)
+
+Compétences :
+Python, Django, FastAPI, Docker, Kubernetes
+"""
+
+
+class CVSectionSplitterTests(SimpleTestCase):
+    def test_sections_are_detected(self):
+        splitter = CVSectionSplitter()
+        headers = [h for h, _ in splitter.split_sections(SAMPLE_CV)]
+        self.assertEqual(headers, ["", "EXPÉRIENCE PROFESSIONNELLE", "Formation", "Compétences"])
+
+    def test_capitalized_lines_are_kept_as_content(self):
+        splitter = CVSectionSplitter()
+        self.assertEqual(
+            splitter.split_sections("Jean Dupont\nCompétences\nPYTHON DJANGO SQL\nAWS GCP\n"
+                                    "Formation\nMASTER INFORMATIQUE"),
+            [("", "Jean Dupont"), ("Compétences", "PYTHON DJANGO SQL\nAWS GCP"),
+             ("Formation", "MASTER INFORMATIQUE")],
+        )
+        self.assertEqual(splitter.split_sections("Compétences\nSQL\nJAVA\nDOCKER"),
+                         [("Compétences", "SQL\nJAVA\nDOCKER")])
+        experience = ("Expérience\nDéveloppeur Java\nCAPGEMINI TECHNOLOGY SERVICES\n2019-2023\n\n"
+                      "THALES GROUP\nIngénieur logiciel (2016-2019)")
+        self.assertEqual(splitter.split_sections(experience), [("Expérience", experience[len("Expérience\n"):])])
+
+    def test_unknown_capitalized_header_needs_a_body(self):
+        splitter = CVSectionSplitter()
+        self.assertEqual(
+            splitter.split_sections("Jean Dupont\n\nPARCOURS ASSOCIATIF\nTrésorier du club\n\n"
+                                    "Compétences\nFormation\nMaster"),
+            [("", "Jean Dupont"), ("PARCOURS ASSOCIATIF", "Trésorier du club"), ("", "Compétences"),
+             ("Formation", "Master")],
+        )
+
+    def test_chunks_never_mix_sections(self):
+        splitter = CVSectionSplitter(chunk_tokens=400, chunk_overlap_tokens=40)
+        chunks = splitter.split_documents([Document(page_content=SAMPLE_CV, metadata={"source": "cv.txt"})])
+        self.assertEqual(len(chunks), 4)
+        experience = chunks[1]
+        self.assertEqual(experience.metadata["section"], "EXPÉRIENCE PROFESSIONNELLE")
+        self.assertIn("Fintech SA", experience.page_content)
+        self.assertIn("WebAgency", experience.page_content)
+
+    def test_chunks_respect_token_budget(self):
+        splitter = CVSectionSplitter(chunk_tokens=30, chunk_overlap_tokens=5)
+        text = "Compétences\n" + " ".join(f"outil{i}" for i in range(200))
+        for header, content in splitter.split_text(text):
+            self.assertLessEqual(splitter.count_tokens(content), 30)
+
+    def test_get_splitter_strategies(self):
+        self.assertIsInstance(get_splitter({"strategy": "cv_sections"}), CVSectionSplitter)
+        self.assertIsInstance(get_splitter({"strategy": "recursive"}), RecursiveCharacterTextSplitter)
+        with self.assertRaises(ValueError):
+            get_splitter({"strategy": "inconnue"})
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertAlmostEqual(percentile([1, 2, 3, 4, 5], 95), 4.8)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_compare_results_flags_regressions(self):
+        baseline = {"runs": [{"corpus_size": 10, "ask_question_p95": 1.0, "peak_rss_mb": 100}]}
+        current = {"runs": [{"corpus_size": 10, "ask_question_p95": 1.5, "peak_rss_mb": 101,
+                             "indexing_seconds": 1, "index_bytes": 1, "ask_question_p50": 1,
+                             "ask_question_p99": 1}]}
+        regressions = compare_results(baseline, current, tolerance=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("ask_question_p95", regressions[0])
+
+    def test_run_benchmark_with_local_models(self):
+        results = run_benchmark(sizes=[5, 3], queries=["Développeur Python"], repeat=2)
+        run = results["runs"][0]
+        self.assertEqual(run["corpus_size"], 5)
+        self.assertGreater(run["index_vectors"], 0)
+        self.assertGreater(run["index_bytes"], 0)
+        self.assertLessEqual(run["ask_question_p50"], run["ask_question_p99"])
+        # Chaque taille est mesurée dans son propre processus
+        self.assertTrue(all(r["peak_rss_mb"] > 0 for r in results["runs"]))
+
+    def test_run_benchmark_without_api_key(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("OPENAI_API_KEY", None)
+            results = run_benchmark(sizes=[2], queries=["Développeur Python"], repeat=1)
+        self.assertGreater(results["runs"][0]["index_vectors"], 0)
+
+    def test_run_benchmark_embedding_dimension(self):
+        small = run_benchmark(sizes=[3], queries=["Développeur Python"], repeat=1,
+                              embedding_dimension=64, isolate=False)["runs"][0]
+        large = run_benchmark(sizes=[3], queries=["Développeur Python"], repeat=1,
+                              embedding_dimension=3072, isolate=False)["runs"][0]
+        self.assertEqual(small["index_vectors"], large["index_vectors"])
+        self.assertGreater(large["index_bytes"], small["index_bytes"] * 10)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram("test_duration_seconds", "Durée de test", buckets=(0.1, 1))
+        histogram.observe(0.05, stage="a")
+        histogram.observe(0.5, stage="a")
+        histogram.observe(5, stage="a")
+        lines = histogram.render()
+        self.assertIn('test_duration_seconds_bucket{stage="a",le="0.1"} 1', lines)
+        self.assertIn('test_duration_seconds_bucket{stage="a",le="1.0"} 2', lines)
+        self.assertIn('test_duration_seconds_bucket{stage="a",le="+Inf"} 3', lines)
+        self.assertIn('test_duration_seconds_count{stage="a"} 3', lines)
+
+    def test_timed_records_errors(self):
+        with self.assertRaises(ValueError):
+            with timed("test_stage_en_erreur"):
+                raise ValueError()
+        output = registry.render()
+        self.assertIn('rag_stage_errors_total{stage="test_stage_en_erreur"} 1', output)
+        self.assertIn('rag_stage_duration_seconds_count{stage="test_stage_en_erreur"} 1', output)
+
+    def test_metrics_endpoint_exposes_pipeline_stages(self):
+        run_benchmark(sizes=[3], queries=["Développeur Python"], repeat=1, isolate=False)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        for stage in ("query_embedding", "faiss_search", "merge_context", "llm_call", "indexing_embed"):
+            self.assertIn(f'stage="{stage}"', body)
+        self.assertIn('rag_llm_tokens_total{kind="prompt",model="gpt-4o"}', body)
+
+
+class MockOpenAIServerTests(SimpleTestCase):
+    def start_server(self, **config):
+        server = MockOpenAIServer(("127.0.0.1", 0), MockOpenAIConfig(
+            chat_latency=0, embedding_latency=0, embedding_dimension=32, **config
+        ))
+        server.start_in_thread()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_compatible_with_langchain_clients(self):
+        server = self.start_server()
+        llm = ChatOpenAI(model="gpt-4o", api_key="sk-test", base_url=server.base_url)
+        response = llm.invoke([{"role": "user", "content": "Évaluer ce CV"}])
+        self.assertRegex(response.content, r"NOTE: \d+/10")
+        self.assertGreater(response.usage_metadata["input_tokens"], 0)
+
+        embeddings = OpenAIEmbeddings(api_key="sk-test", base_url=server.base_url,
+                                      check_embedding_ctx_length=False)
+        vectors = embeddings.embed_documents(["Développeur Python", "Data scientist"])
+        self.assertEqual([len(v) for v in vectors], [32, 32])
+        self.assertEqual(server.stats.by_endpoint, {"chat": 1, "embeddings": 1})
+
+    def test_rate_limit_returns_429(self):
+        server = self.start_server(rate_limit=0.001, burst=1)
+        llm = ChatOpenAI(model="gpt-4o", api_key="sk-test", base_url=server.base_url, max_retries=0)
+        llm.invoke("premier appel")
+        with self.assertRaises(Exception):
+            llm.invoke("second appel")
+        self.assertEqual(server.stats.throttled, 1)
+
+    def test_load_test_recorder_summary(self):
+        recorder = LoadTestRecorder()
+        for duration, ok in [(0.1, True), (0.2, True), (0.3, False), (0.4, True)]:
+            recorder.record("send_message", duration, ok)
+        stats = recorder.summary()["endpoints"]["send_message"]
+        self.assertEqual(stats["requests"], 4)
+        self.assertEqual(stats["error_rate"], 0.25)
+        self.assertEqual(stats["max"], 0.4)
+
+
+class ViewQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("recruteur", password="motdepasse")
+        self.client.force_login(self.user)
+        DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=self.user, filename=f"cv_{i}.pdf", file_size=1000, is_indexed=i % 2 == 0)
+            for i in range(30)
+        ])
+        self.conversation = Conversation.objects.create(user=self.user, title="Profils Python")
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.user if i % 2 == 0 else None, content=f"message {i}")
+            for i in range(80)
+        ])
+
+    def test_home_query_count(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["total_documents"], 30)
+        self.assertEqual(response.context["total_conversations"], 1)
+
+    def test_chat_interface_query_count(self):
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse("chat_interface", args=[self.conversation.id]))
+        self.assertEqual(response.context["total_documents"], 30)
+        self.assertEqual(response.context["indexed_documents"], 15)
+        self.assertEqual(len(response.context["chat_messages"]), settings.CHAT_PAGE_SIZE)
+        self.assertEqual(response.context["chat_messages"][-1].content, "message 79")
+        self.assertIsNotNone(response.context["messages_cursor"])
+
+    @mock.patch("chatbot.views.llm_service.ask_question", return_value=([], None))
+    def test_send_message_query_count(self, ask_question):
+        payload = {"message": "Développeurs Python ?", "conversation_id": self.conversation.id}
+        with self.assertNumQueries(13):
+            response = self.client.post(reverse("send_message"), json.dumps(payload), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        context = ask_question.call_args.kwargs["conversation_context"]
+        self.assertEqual(len(context), settings.CHAT_HISTORY_MESSAGES)
+        self.assertEqual(context[-1], {"role": "assistant", "content": "message 79"})
+        self.assertEqual(self.conversation.messages.count(), 82)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 2)
+
+    def test_keyset_pagination_walks_all_documents(self):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(reverse("api_documents"), params).json()
+            seen.extend(d["id"] for d in data["results"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_messages_api_pages_backwards(self):
+        url = reverse("api_messages", args=[self.conversation.id])
+        first = self.client.get(url, {"limit": 50}).json()
+        self.assertEqual(first["results"][0]["content"], "message 79")
+        second = self.client.get(url, {"limit": 50, "cursor": first["next_cursor"]}).json()
+        self.assertEqual(len(second["results"]), 30)
+        self.assertEqual(second["results"][-1]["content"], "message 0")
+        self.assertIsNone(second["next_cursor"])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("api_conversations"), {"cursor": "pas-un-curseur"})
+        self.assertEqual(response.status_code, 400)
+
+        # Curseurs bien formés contenant des valeurs invalides
+        for values in (["not-a-date", 1], [{"a": 1}, 2], [None, None], ["2024-01-01T00:00:00", "abc"],
+                       ["2024-01-01T00:00:00", 10 ** 30], [True, 1]):
+            response = self.client.get(reverse("api_conversations"), {"cursor": encode_cursor(values)})
+            self.assertEqual(response.status_code, 400, values)
+
+        # Date sans fuseau horaire acceptée
+        response = self.client.get(reverse("api_conversations"),
+                                   {"cursor": encode_cursor(["2024-01-01T00:00:00", 1])})
+        self.assertEqual(response.status_code, 200)
+
+
+class ScreeningResultTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("recruteur", password="motdepasse")
+        self.client.force_login(self.user)
+        self.document = DocumentUpload.objects.create(
+            user=self.user, filename="alice.pdf", file_size=1000, content_hash="ab" * 32, is_indexed=True
+        )
+        self.results = [
+            {"filename": "alice.pdf", "filepath": f"/data/ab/{'ab' * 32}.pdf", "score_faiss": 0.42,
+             "score_llm": 9, "decision": "keep", "justification": "Profil Python solide. " * 40,
+             "aliases": ["alice_copie.pdf"]},
+            {"filename": "bob.pdf", "filepath": "/data/cd/bob.pdf", "score_faiss": 0.87,
+             "score_llm": 3, "decision": "reject", "justification": "Peu d'expérience.", "aliases": []},
+        ]
+
+    def send(self, message, conversation_id=None):
+        payload = {"message": message, "conversation_id": conversation_id}
+        return self.client.post(reverse("send_message"), json.dumps(payload), content_type="application/json")
+
+    def test_parse_verdict(self):
+        self.assertEqual(
+            parse_verdict("NOTE: 8/10 — Décision : **À conserver**\nJustification : Bon profil."),
+            (8, "keep", "Bon profil."),
+        )
+        self.assertEqual(parse_verdict("Réponse libre"), (0, "", "Réponse libre"))
+
+    def test_results_are_stored_as_compact_records(self):
+        with mock.patch("chatbot.views.llm_service.ask_question", return_value=(self.results, None)):
+            data = self.send("Développeurs Python ?").json()
+        conversation = Conversation.objects.get(pk=data["conversation_id"])
+        self.assertEqual(data["bot_message"]["content"], "Voici les CV les plus pertinents :")
+        self.assertEqual([r["filename"] for r in data["results"]], ["alice.pdf", "bob.pdf"])
+
+        best = conversation.screening_results.get(score_llm__gte=8)
+        self.assertEqual(best.message_id, data["bot_message"]["id"])
+        self.assertEqual(best.document, self.document)
+        self.assertEqual(best.justification, self.results[0]["justification"])
+        self.assertEqual(best.aliases, ["alice_copie.pdf"])
+        self.assertIsNone(conversation.screening_results.get(rank=2).document)
+
+        # Justification longue compressée, courte stockée en clair
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rank, justification FROM {ScreeningResult._meta.db_table}")
+            raw = {rank: bytes(value) for rank, value in cursor.fetchall()}
+        self.assertEqual(raw[1][:1], b"z")
+        self.assertLess(len(raw[1]), len(self.results[0]["justification"]))
+        self.assertEqual(raw[2], b"r" + "Peu d'expérience.".encode("utf-8"))
+
+    def test_question_is_saved_before_llm_call(self):
+        def ask_question(question, conversation_context):
+            self.assertTrue(Message.objects.filter(content=question, sender=self.user).exists())
+            return [], "Service indisponible"
+
+        with mock.patch("chatbot.views.llm_service.ask_question", side_effect=ask_question):
+            response = self.send("Développeurs Python ?")
+        self.assertEqual(response.status_code, 400)
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.message_count, 1)
+        self.assertEqual(list(conversation.messages.values_list("content", flat=True)), ["Développeurs Python ?"])
+
+    def test_history_and_ui_read_records(self):
+        with mock.patch("chatbot.views.llm_service.ask_question", return_value=(self.results, None)):
+            conversation_id = self.send("Développeurs Python ?").json()["conversation_id"]
+        with mock.patch("chatbot.views.llm_service.ask_question", return_value=([], None)) as ask_question:
+            self.send("Et en Java ?", conversation_id)
+        context = ask_question.call_args.kwargs["conversation_context"]
+        self.assertEqual(context[1], {
+            "role": "assistant",
+            "content": "Voici les CV les plus pertinents :\n"
+                       "alice.pdf — 9/10, À conserver\nbob.pdf — 3/10, À écarter",
+        })
+
+        response = self.client.get(reverse("chat_interface", args=[conversation_id]))
+        self.assertContains(response, "Score LLM : 9/10, FAISS : 0,42")
+        self.assertContains(response, "doublons : alice_copie.pdf")
+        data = self.client.get(reverse("api_messages", args=[conversation_id])).json()
+        bot_message = next(m for m in data["results"] if m["results"])
+        self.assertEqual(bot_message["results"][1]["decision_display"], "À écarter")
+
+
+class ContentAddressedUploadTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.data_folder = Path(tmp.name) / "raw"
+        index_dir = Path(tmp.name) / "faiss_index"
+        index_dir.mkdir()
+        overrides = override_settings(DATA_FOLDER=self.data_folder, FAISS_INDEX_DIR=index_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        models = local_models()
+        _, fake_llm = models.__enter__()
+        self.addCleanup(models.__exit__, None, None, None)
+        llm_patch = mock.patch.object(llm_service, "llm", fake_llm)
+        llm_patch.start()
+        self.addCleanup(llm_patch.stop)
+        self.addCleanup(llm_service.build_graph)
+
+        self.alice = User.objects.create_user("alice", password="motdepasse")
+        self.bob = User.objects.create_user("bob", password="motdepasse")
+
+    def upload(self, user, files):
+        self.client.force_login(user)
+        uploads = [SimpleUploadedFile(name, content.encode("utf-8"), "text/plain") for name, content in files]
+        return self.client.post(reverse("upload_cvs"), {"files": uploads})
+
+    def blobs(self):
+        return sorted(p.name for p in self.data_folder.glob("*/*.txt"))
+
+    def test_same_name_from_different_users_does_not_overwrite(self):
+        self.upload(self.alice, [("cv.txt", "Alice développeuse Python Django")])
+        self.upload(self.bob, [("cv.txt", "Bob ingénieur DevOps Kubernetes")])
+        self.assertEqual(len(self.blobs()), 2)
+        hashes = set(DocumentUpload.objects.values_list("content_hash", flat=True))
+        self.assertEqual(len(hashes), 2)
+
+    def test_identical_bytes_are_stored_once(self):
+        content = "Alice développeuse Python Django"
+        self.upload(self.alice, [("cv.txt", content), ("cv_copie.txt", content)])
+        self.assertEqual(len(self.blobs()), 1)
+        doc = DocumentUpload.objects.first()
+        self.assertEqual(doc.content_hash, hashlib.sha256(content.encode("utf-8")).hexdigest())
+        self.assertEqual(self.blobs(), [f"{doc.content_hash}.txt"])
+
+    def test_indexing_only_processes_new_hashes(self):
+        self.upload(self.alice, [("alice.txt", "Alice développeuse Python Django")])
+        self.client.get(reverse("index_cvs"))
+        self.assertFalse(DocumentUpload.objects.filter(is_indexed=False).exists())
+
+        self.upload(self.alice, [
+            ("alice_bis.txt", "Alice développeuse Python Django"),
+            ("bob.txt", "Bob ingénieur DevOps Kubernetes"),
+        ])
+        # Le contenu déjà indexé est reconnu dès l'upload, sous son nouveau nom
+        self.assertTrue(DocumentUpload.objects.get(filename="alice_bis.txt").is_indexed)
+        self.assertEqual(llm_service.resolve_filename("alice_bis.txt"), "alice.txt")
+
+        bob_hash = DocumentUpload.objects.get(filename="bob.txt").content_hash
+        with mock.patch.object(IndexingService, "build_vector_store",
+                               wraps=IndexingService.build_vector_store) as build:
+            self.client.get(reverse("index_cvs"))
+        self.assertEqual(build.call_args.kwargs["new_hashes"], {bob_hash})
+        self.assertEqual(llm_service.vector_store.index.ntotal, 2)
+
+        results, error = llm_service.ask_question("DevOps Kubernetes")
+        self.assertIsNone(error)
+        self.assertEqual({r["filename"] for r in results}, {"alice.txt", "bob.txt"})
+
+    def test_rebuild_without_index_keeps_original_names(self):
+        self.upload(self.alice, [("alice.txt", "Alice développeuse Python Django")])
+        self.client.get(reverse("index_cvs"))
+        # Nouveau serveur partageant la base : pas d'index local
+        for path in settings.FAISS_INDEX_DIR.iterdir():
+            path.unlink()
+        self.upload(self.bob, [("bob.txt", "Bob ingénieur DevOps Kubernetes")])
+        self.client.get(reverse("index_cvs"))
+
+        self.assertEqual(llm_service.vector_store.index.ntotal, 2)
+        results, error = llm_service.ask_question("DevOps Kubernetes")
+        self.assertIsNone(error)
+        self.assertEqual({r["filename"] for r in results}, {"alice.txt", "bob.txt"})
+
+    def test_compare_chunkers_matches_original_filenames(self):
+        self.upload(self.alice, [("alice.txt", "Alice développeuse Python Django"),
+                                 ("alice_copie.txt", "Alice développeuse Python Django")])
+        self.upload(self.bob, [("bob.txt", "Bob ingénieur DevOps Kubernetes")])
+        queries = self.data_folder.parent / "queries.json"
+        queries.write_text(json.dumps([{"query": "Python Django", "relevant": ["alice_copie.txt"]}]))
+        output = self.data_folder.parent / "report.json"
+        call_command("compare_chunkers", data_folder=self.data_folder, queries=queries, output=output,
+                     stdout=io.StringIO())
+        report = json.loads(output.read_text())
+        self.assertEqual(report["recursive"]["recall_at_k"], 1.0)
+        self.assertEqual(report["cv_sections"]["recall_at_k"], 1.0)
+
+    def test_incremental_indexing_skips_copies_of_indexed_cvs(self):
+        self.upload(self.alice, [("alice.txt", "Alice développeuse Python Django")])
+        self.client.get(reverse("index_cvs"))
+        # Réexport du même CV : octets différents, même texte
+        self.upload(self.alice, [("alice_export.txt", "ALICE  développeuse Python Django\n")])
+        self.client.get(reverse("index_cvs"))
+
+        self.assertEqual(llm_service.vector_store.index.ntotal, 1)
+        self.assertEqual(llm_service.resolve_filename("alice_export.txt"), "alice.txt")
+        self.assertTrue(DocumentUpload.objects.get(filename="alice_export.txt").is_indexed)
+
+    def delete(self, filename):
+        document = DocumentUpload.objects.get(filename=filename)
+        self.client.force_login(document.user)
+        return self.client.post(reverse("delete_document", args=[document.id]))
+
+    def test_deleted_document_leaves_storage_and_index(self):
+        self.upload(self.alice, [("alice.txt", "Alice développeuse Python Django"),
+                                 ("alice_copie.txt", "Alice développeuse Python Django")])
+        self.upload(self.bob, [("bob.txt", "Bob ingénieur DevOps Kubernetes")])
+        self.client.get(reverse("index_cvs"))
+
+        # Un autre upload référence encore le même contenu : rien n'est retiré
+        self.delete("alice_copie.txt")
+        self.assertEqual(len(self.blobs()), 2)
+        self.assertEqual(llm_service.vector_store.index.ntotal, 2)
+
+        self.delete("alice.txt")
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(llm_service.vector_store.index.ntotal, 1)
+        results, _ = llm_service.ask_question("Python Django")
+        self.assertEqual({r["filename"] for r in results}, {"bob.txt"})
+
+        # Reconstruction complète : le CV supprimé ne revient pas sous son empreinte
+        for path in settings.FAISS_INDEX_DIR.iterdir():
+            path.unlink()
+        self.client.get(reverse("index_cvs"))
+        results, _ = llm_service.ask_question("Python Django")
+        self.assertEqual({r["filename"] for r in results}, {"bob.txt"})
+
+    def test_duplicates_of_deleted_document_are_reindexed(self):
+        self.upload(self.alice, [("alice.txt", "Alice développeuse Python Django")])
+        self.client.get(reverse("index_cvs"))
+        self.upload(self.alice, [("alice_export.txt", "ALICE  développeuse Python Django\n")])
+        self.client.get(reverse("index_cvs"))
+
+        self.delete("alice.txt")
+        self.assertFalse(DocumentUpload.objects.get(filename="alice_export.txt").is_indexed)
+        self.client.get(reverse("index_cvs"))
+        results, _ = llm_service.ask_question("Python Django")
+        self.assertEqual({r["filename"] for r in results}, {"alice_export.txt"})
+        self.assertEqual(llm_service.resolve_filename("alice_export.txt"), "alice_export.txt")
+
+    def test_upload_during_indexing_stays_pending(self):
+        self.upload(self.alice, [("alice.txt", "Alice développeuse Python Django")])
+        build = IndexingService.build_vector_store
+
+        def build_with_concurrent_upload(**kwargs):
+            result = build(**kwargs)
+            self.upload(self.bob, [("bob.txt", "Bob ingénieur DevOps Kubernetes")])
+            return result
+
+        with mock.patch.object(IndexingService, "build_vector_store", side_effect=build_with_concurrent_upload):
+            self.client.get(reverse("index_cvs"))
+        self.assertTrue(DocumentUpload.objects.get(filename="alice.txt").is_indexed)
+        self.assertFalse(DocumentUpload.objects.get(filename="bob.txt").is_indexed)
+
+        self.client.get(reverse("index_cvs"))
+        self.assertTrue(DocumentUpload.objects.get(filename="bob.txt").is_indexed)
+        self.assertEqual(llm_service.vector_store.index.ntotal, 2)
+
+
+class AdminScalabilityTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password="motdepasse")
+        self.client.force_login(self.admin)
+
+    def create_messages(self, conversations, per_conversation):
+        for i in range(conversations):
+            conversation = Conversation.objects.create(user=self.admin, title=f"Conversation {i}")
+            Message.objects.bulk_create([
+                Message(conversation=conversation, sender=self.admin if j % 2 == 0 else None, content="x" * 500)
+                for j in range(per_conversation)
+            ])
+            ScreeningResult.objects.bulk_create([
+                ScreeningResult(conversation=conversation, message=message, rank=1, filename=f"cv_{i}.pdf",
+                                score_faiss=0.5, score_llm=message.id % 11, justification="Profil. " * 50)
+                for message in conversation.messages.filter(sender__isnull=True)
+            ])
+
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(f"admin:chatbot_{name}_changelist"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.create_messages(2, 3)
+        names = ("message", "conversation", "screeningresult")
+        small = {name: self.changelist_queries(name) for name in names}
+        self.create_messages(20, 5)
+        large = {name: self.changelist_queries(name) for name in names}
+        self.assertEqual(small, large)
+
+    def test_screening_results_filter_by_score_range(self):
+        self.create_messages(4, 4)
+        url = reverse("admin:chatbot_screeningresult_changelist")
+        for value, (low, high) in ScoreRangeFilter.ranges.items():
+            response = self.client.get(url, {"score": value})
+            expected = ScreeningResult.objects.filter(score_llm__gte=low, score_llm__lte=high).count()
+            self.assertEqual(response.context["cl"].result_count, expected)
+
+    def test_autocomplete_filters_restrict_changelist(self):
+        self.create_messages(3, 4)
+        conversation = Conversation.objects.first()
+        url = reverse("admin:chatbot_message_changelist")
+        response = self.client.get(url, {"conversation__id__exact": conversation.id})
+        self.assertEqual(response.context["cl"].result_count, 4)
+        self.assertContains(response, 'data-model-name="message"')
+        response = self.client.get(url, {"bot": "1"})
+        self.assertEqual(response.context["cl"].result_count, 6)
+
+    def test_admin_keeps_message_counter_in_sync(self):
+        conversation = Conversation.objects.create(user=self.admin)
+        self.client.post(reverse("admin:chatbot_message_add"), {
+            "conversation": conversation.id, "sender": self.admin.id, "content": "Bonjour",
+            "timestamp_0": "", "timestamp_1": "",
+        })
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.message_count, 1)
+
+        # Déplacer le message vers une autre conversation
+        message = conversation.messages.get()
+        other = Conversation.objects.create(user=self.admin)
+        self.client.post(reverse("admin:chatbot_message_change", args=[message.id]), {
+            "conversation": other.id, "sender": self.admin.id, "content": "Bonjour",
+        })
+        conversation.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((conversation.message_count, other.message_count), (0, 1))
+
+        self.client.post(reverse("admin:chatbot_message_change", args=[message.id]), {
+            "conversation": conversation.id, "sender": self.admin.id, "content": "Bonjour modifié",
+        })
+        self.client.post(reverse("admin:chatbot_message_change", args=[message.id]), {
+            "conversation": conversation.id, "sender": self.admin.id, "content": "Bonjour",
+        })
+        conversation.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((conversation.message_count, other.message_count), (1, 0))
+
+        self.client.post(reverse("admin:chatbot_message_changelist"), {
+            "action": "delete_selected", "_selected_action": [message.id], "post": "yes",
+        })
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.message_count, 0)
+
+    def test_paginator_estimates_unfiltered_large_tables(self):
+        self.create_messages(1, 30)
+        # Lignes supprimées : l'estimation SQLite (plus grand id) dépasse le nombre réel
+        Message.objects.filter(id__in=Message.objects.order_by("id").values("id")[:6]).delete()
+        queryset = Message.objects.order_by("-id")
+        max_id = Message.objects.order_by("-id").values_list("id", flat=True)[0]
+        with mock.patch.object(EstimatedCountPaginator, "exact_count_threshold", 10):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, max_id)
+            self.assertEqual(EstimatedCountPaginator(queryset.filter(sender__isnull=True), 10).count, 12)
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 24)
+
+
+class IndexSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.source = self.root / "source" / "faiss_index"
+        store = FAISS.from_texts(
+            [f"CV {i} développeur Python Django" for i in range(20)], HashingEmbeddings(),
+            metadatas=[{"source": f"cv_{i}.txt"} for i in range(20)],
+        )
+        store.save_local(str(self.source))
+        (self.source / "aliases.json").write_text('{"cv_copie.txt": "cv_1.txt"}', encoding="utf-8")
+        self.archive = self.root / "snapshot.tar.zst"
+
+    def test_export_then_import_restores_index(self):
+        call_command("export_index_snapshot", str(self.archive), index_dir=self.source, stdout=io.StringIO())
+        target = self.root / "node2" / "faiss_index"
+        call_command("import_index_snapshot", str(self.archive), index_dir=target, stdout=io.StringIO())
+
+        for name in ("index.faiss", "index.pkl", "aliases.json"):
+            self.assertEqual((target / name).read_bytes(), (self.source / name).read_bytes())
+        store = FAISS.load_local(str(target), HashingEmbeddings(), allow_dangerous_deserialization=True)
+        self.assertEqual(store.index.ntotal, 20)
+        self.assertEqual([p.name for p in target.parent.iterdir()], ["faiss_index"])
+
+    def test_import_keeps_directory_mode(self):
+        export_snapshot(self.archive, index_dir=self.source)
+        self.source.chmod(0o755)
+        import_snapshot(self.archive, index_dir=self.source, force=True)
+        self.assertEqual(self.source.stat().st_mode & 0o777, 0o755)
+
+        target = self.root / "node2" / "faiss_index"
+        import_snapshot(self.archive, index_dir=target)
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(target.stat().st_mode & 0o777, 0o777 & ~umask)
+
+    def test_existing_index_requires_force(self):
+        export_snapshot(self.archive, index_dir=self.source)
+        with self.assertRaises(CommandError):
+            call_command("import_index_snapshot", str(self.archive), index_dir=self.source)
+        call_command("import_index_snapshot", str(self.archive), index_dir=self.source, force=True,
+                     stdout=io.StringIO())
+
+    def test_corrupted_archive_leaves_index_untouched(self):
+        export_snapshot(self.archive, index_dir=self.source)
+        target = self.root / "node2" / "faiss_index"
+        target.mkdir(parents=True)
+        (target / "index.faiss").write_bytes(b"ancien index")
+
+        data = bytearray(self.archive.read_bytes())
+        data[len(data) // 2] ^= 0xFF
+        self.archive.write_bytes(bytes(data))
+        with self.assertRaisesRegex(SnapshotError, "archive invalide"):
+            import_snapshot(self.archive, index_dir=target, force=True)
+
+        # Empreinte de l'archive contournée : les vérifications internes échouent aussi
+        with self.assertRaises(SnapshotError):
+            import_snapshot(self.archive, index_dir=target, force=True,
+                            checksum=hashlib.sha256(bytes(data)).hexdigest())
+        self.assertEqual((target / "index.faiss").read_bytes(), b"ancien index")
+        self.assertEqual([p.name for p in target.parent.iterdir()], ["faiss_index"])
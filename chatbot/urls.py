@@ -23,4 +23,12 @@ urlpatterns = [
     path('chat/<int:conversation_id>/',        views.chat_interface,    name='chat_interface'),
     path('send-message/',                      views.send_message,      name='send_message'),
     path('conversations/<int:conversation_id>/delete/', views.delete_conversation, name='delete_conversation'),
+
+    # API JSON paginées
+    path('api/documents/',                     views.api_documents,     name='api_documents'),
+    path('api/conversations/',                 views.api_conversations, name='api_conversations'),
+    path('api/conversations/<int:conversation_id>/messages/', views.api_messages, name='api_messages'),
+
+    # Supervision
+    path('metrics',                            views.metrics,           name='metrics'),
 ]
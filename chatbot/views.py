@@ -1,24 +1,35 @@
 # Imports organisés
-import os, shutil, json, time, uuid, logging
+import json, time, uuid, logging
+from pathlib import Path
 
+from django.db import transaction
+from django.db.models import Count, F, Max, Prefetch, Q
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 from django.contrib import messages
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods, require_POST
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
-from .models import Conversation, Message, DocumentUpload
+from .models import Conversation, Message, DocumentUpload, ScreeningResult
+from .pagination import InvalidCursor, keyset_paginate, parse_limit
+from .storage import delete_blobs, filenames_by_hash, store_upload
 from .rag_system.indexing import IndexingService
 from .rag_system.llm_processing import llm_service
+from .rag_system.metrics import registry, start_trace, timed
 
 logger = logging.getLogger(__name__)
 
+# Ordres de tri des listes paginées (la dernière clé doit être unique)
+DOCUMENT_ORDERING = ['-upload_date', '-id']
+CONVERSATION_ORDERING = ['-updated_at', '-id']
+MESSAGE_ORDERING = ['-timestamp', '-id']
+
 # Utilisateurs authentifiés ou anonymes
 def get_user_or_session_id(request):
     if request.user.is_authenticated:
@@ -30,6 +41,89 @@ def get_user_or_session_id(request):
 def get_user_if_authenticated(user_or_session):
     return user_or_session if isinstance(user_or_session, User) else None
 
+def get_document_stats(user_filter):
+    """Nombre de documents et de documents indexés, en une seule requête"""
+    return DocumentUpload.objects.filter(user=user_filter).aggregate(
+        total=Count('id'),
+        indexed=Count('id', filter=Q(is_indexed=True)),
+    )
+
+def with_screening_results(queryset):
+    """Charger les évaluations de CV des messages en une seule requête supplémentaire"""
+    return queryset.prefetch_related(
+        Prefetch('screening_results', queryset=ScreeningResult.objects.order_by('rank'))
+    )
+
+def get_latest_messages(conversation, limit):
+    """Derniers messages d'une conversation, dans l'ordre chronologique"""
+    page, next_cursor = keyset_paginate(
+        with_screening_results(Message.objects.filter(conversation=conversation)), MESSAGE_ORDERING, limit=limit
+    )
+    return page[::-1], next_cursor
+
+def get_history_context(conversation, sender_id):
+    """
+    Derniers échanges pour le prompt. Les réponses du bot sont résumées à partir des
+    évaluations enregistrées (fichier, note, décision) sans les justifications.
+    """
+    history = list(
+        Message.objects.filter(conversation=conversation)
+        .order_by(*MESSAGE_ORDERING)
+        .values_list('id', 'sender_id', 'content')[:settings.CHAT_HISTORY_MESSAGES]
+    )[::-1]
+    summaries = {}
+    bot_ids = [m_id for m_id, s_id, _ in history if s_id is None]
+    if bot_ids:
+        results = (ScreeningResult.objects.filter(message_id__in=bot_ids)
+                   .only('message_id', 'rank', 'filename', 'score_llm', 'decision')
+                   .order_by('message_id', 'rank'))
+        for r in results:
+            summaries.setdefault(r.message_id, []).append(r.summary())
+    return [
+        {
+            "role": "user" if s_id == sender_id else "assistant",
+            "content": "\n".join([content] + summaries.get(m_id, [])),
+        }
+        for m_id, s_id, content in history
+    ]
+
+def build_screening_results(conversation, message, user_filter, results):
+    """Évaluations du LLM sous forme d'enregistrements, liés au document uploadé quand il est connu"""
+    # Les uploads sont stockés sous leur empreinte : le nom du fichier indexé donne le content_hash
+    hashes = {Path(r['filepath']).stem for r in results}
+    documents = dict(
+        DocumentUpload.objects.filter(user=user_filter, content_hash__in=hashes)
+        .order_by('id').values_list('content_hash', 'id')
+    )
+    return [
+        ScreeningResult(
+            conversation=conversation,
+            message=message,
+            document_id=documents.get(Path(r['filepath']).stem),
+            rank=i + 1,
+            filename=r['filename'],
+            score_faiss=r['score_faiss'],
+            score_llm=r['score_llm'],
+            decision=r.get('decision', ''),
+            justification=r['justification'],
+            aliases=r.get('aliases', []),
+        )
+        for i, r in enumerate(results)
+    ]
+
+def serialize_screening_result(result):
+    return {
+        'rank': result.rank,
+        'filename': result.filename,
+        'document_id': result.document_id,
+        'score_faiss': result.score_faiss,
+        'score_llm': result.score_llm,
+        'decision': result.decision,
+        'decision_display': result.get_decision_display(),
+        'justification': result.justification,
+        'aliases': result.aliases,
+    }
+
 # Inscription
 def register_user(request):
     form = UserCreationForm(request.POST or None)
@@ -42,15 +136,22 @@ def register_user(request):
 # Accueil
 @login_required
 def home(request):
-    user_docs = DocumentUpload.objects.filter(user=request.user).order_by('-upload_date')
-    user_convs = Conversation.objects.filter(user=request.user).order_by('-updated_at')
+    documents, documents_cursor = keyset_paginate(
+        DocumentUpload.objects.filter(user=request.user), DOCUMENT_ORDERING, limit=settings.CHAT_PAGE_SIZE
+    )
+    user_convs = Conversation.objects.filter(user=request.user)
+    recent = user_convs.order_by(*CONVERSATION_ORDERING).only('id', 'title', 'updated_at')[:5]
     return render(request, 'rag_app/home.html', {
-        'documents': user_docs,
-        'conversations': user_convs
+        'documents': documents,
+        'documents_cursor': documents_cursor,
+        'total_documents': get_document_stats(request.user)['total'],
+        'conversations': recent,
+        'total_conversations': user_convs.count(),
     })
 
 # Upload CVs
 @csrf_exempt
+@start_trace("upload_cvs")
 def upload_cvs(request):
     if request.method == 'POST':
         files = request.FILES.getlist('files')
@@ -59,34 +160,77 @@ def upload_cvs(request):
             return redirect('home')
 
         user = get_user_or_session_id(request)
-        data_folder = settings.DATA_FOLDER
-        os.makedirs(data_folder, exist_ok=True)
-
-        for f in os.listdir(data_folder):
-            file_path = os.path.join(data_folder, f)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-
-        for f in files:
-            file_path = os.path.join(data_folder, f.name)
-            with open(file_path, 'wb+') as destination:
-                for chunk in f.chunks():
-                    destination.write(chunk)
-
-            DocumentUpload.objects.create(
-                user=get_user_if_authenticated(user),
-                filename=f.name,
-                file_size=f.size
-            )
-        messages.success(request, f"{len(files)} fichiers sauvegardés avec succès")
+        stored = []
+        with timed("upload_store", files=len(files)):
+            for f in files:
+                content_hash, size, _, created = store_upload(f)
+                stored.append((f.name, content_hash, size, created))
+
+        # Un contenu déjà indexé (même octets, quel que soit le nom) n'a pas à être réindexé
+        hashes = {content_hash for _, content_hash, _, _ in stored}
+        indexed_hashes = {}
+        for content_hash, filename in (DocumentUpload.objects.filter(content_hash__in=hashes, is_indexed=True)
+                                       .order_by('upload_date', 'id').values_list('content_hash', 'filename')):
+            indexed_hashes.setdefault(content_hash, filename)
+        now = timezone.now()
+        with timed("db_write", table="documentupload"):
+            DocumentUpload.objects.bulk_create([
+                DocumentUpload(
+                    user=get_user_if_authenticated(user),
+                    filename=name,
+                    file_size=size,
+                    content_hash=content_hash,
+                    is_indexed=content_hash in indexed_hashes,
+                    indexing_date=now if content_hash in indexed_hashes else None,
+                )
+                for name, content_hash, size, _ in stored
+            ])
+
+        # Les nouveaux noms d'un contenu déjà indexé restent résolvables via la table d'alias
+        new_aliases = {
+            name: indexed_hashes[content_hash]
+            for name, content_hash, _, _ in stored
+            if content_hash in indexed_hashes and name != indexed_hashes[content_hash]
+        }
+        if new_aliases:
+            IndexingService.add_aliases(new_aliases)
+            llm_service.load_aliases()
+
+        new_files = sum(1 for *_, created in stored if created)
+        messages.success(
+            request,
+            f"{len(files)} fichiers sauvegardés avec succès ({len(files) - new_files} déjà présents)"
+        )
     return redirect('home')
 
 # Indexation
+@start_trace("index_cvs")
 def index_cvs(request):
-    success, msg = IndexingService.build_vector_store()
+    # Seuls les documents déjà uploadés au lancement seront marqués indexés :
+    # ceux qui arrivent pendant l'indexation (identifiants plus grands) restent en attente
+    last_id = DocumentUpload.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    stored = DocumentUpload.objects.exclude(content_hash='').filter(id__lte=last_id)
+    # Reconstruction complète s'il reste des fichiers déposés avant le stockage par empreinte,
+    # ou s'il n'y a pas encore d'index (index supprimé, nouveau serveur partageant la base) :
+    # tous les fichiers sont alors réindexés et doivent retrouver leur nom d'origine
+    full_rebuild = (
+        DocumentUpload.objects.filter(is_indexed=False, content_hash='').exists()
+        or not (settings.FAISS_INDEX_DIR / "index.faiss").exists()
+    )
+    if not full_rebuild:
+        # Seules les empreintes en attente qui ne sont pas déjà dans l'index sont traitées
+        indexed_hashes = stored.filter(is_indexed=True).values('content_hash')
+        stored = stored.filter(is_indexed=False).exclude(content_hash__in=indexed_hashes)
+
+    filenames = filenames_by_hash(stored)
+
+    success, msg = IndexingService.build_vector_store(
+        new_hashes=None if full_rebuild else set(filenames),
+        filenames=filenames,
+    )
     if success:
         llm_service.build_graph()
-        DocumentUpload.objects.filter(is_indexed=False).update(
+        DocumentUpload.objects.filter(is_indexed=False, id__lte=last_id).update(
             is_indexed=True, indexing_date=timezone.now()
         )
         messages.success(request, msg)
@@ -103,20 +247,27 @@ def chat_interface(request, conversation_id=None):
     if conversation_id:
         conversation = get_object_or_404(Conversation, pk=conversation_id, user=user_filter)
 
-    recent = Conversation.objects.filter(user=user_filter).order_by('-updated_at')[:10]
-    documents = DocumentUpload.objects.filter(user=user_filter).order_by('-upload_date')
+    chat_messages, messages_cursor = [], None
+    if conversation:
+        chat_messages, messages_cursor = get_latest_messages(conversation, settings.CHAT_PAGE_SIZE)
+
+    recent = (Conversation.objects.filter(user=user_filter)
+              .order_by(*CONVERSATION_ORDERING).only('id', 'title', 'updated_at')[:10])
+    stats = get_document_stats(user_filter)
 
     return render(request, 'rag_app/chat.html', {
         'conversation': conversation,
+        'chat_messages': chat_messages,
+        'messages_cursor': messages_cursor,
         'recent_conversations': recent,
-        'uploaded_documents': documents,
-        'total_documents': documents.count(),
-        'indexed_documents': documents.filter(is_indexed=True).count(),
+        'total_documents': stats['total'],
+        'indexed_documents': stats['indexed'],
     })
 
 # Envoi message
 @csrf_exempt
 @require_http_methods(["POST"])
+@start_trace("send_message")
 def send_message(request):
     try:
         data = json.loads(request.body)
@@ -128,49 +279,52 @@ def send_message(request):
         user_filter = get_user_if_authenticated(user)
         conv_id = data.get('conversation_id')
 
-        if conv_id:
-            conversation = get_object_or_404(Conversation, pk=conv_id, user=user_filter)
-        else:
-            conversation = Conversation.objects.create(
-                user=user_filter,
-                title=(content[:50] + '...') if len(content) > 50 else content,
-                created_at=timezone.now()
-            )
-
-        user_msg = Message.objects.create(
-            conversation=conversation,
-            sender=user_filter,
-            content=content,
-            timestamp=timezone.now()
-        )
-
-        history = Message.objects.filter(conversation=conversation).order_by('timestamp')
-        context = [{"role": "user" if m.sender == user_msg.sender else "assistant", "content": m.content} for m in history]
+        sender_id = user_filter.id if user_filter else None
+        with timed("db_read_history"):
+            context = []
+            if conv_id:
+                conversation = get_object_or_404(Conversation.objects.only('id'), pk=conv_id, user=user_filter)
+                # Seuls les derniers messages sont utiles au prompt : lecture bornée par l'index (conversation, timestamp)
+                context = get_history_context(conversation, sender_id)
+
+        if not conv_id:
+            with timed("db_write", table="conversation"):
+                conversation = Conversation.objects.create(
+                    user=user_filter,
+                    title=(content[:50] + '...') if len(content) > 50 else content,
+                    created_at=timezone.now()
+                )
+
+        # La question est enregistrée avant l'appel au LLM (plusieurs secondes) :
+        # aucune transaction ni verrou d'écriture n'est gardé pendant l'appel
+        with timed("db_write", table="message"), transaction.atomic():
+            user_msg = Message.objects.create(conversation=conversation, sender=user_filter, content=content)
+            Conversation.objects.filter(pk=conversation.pk).update(message_count=F('message_count') + 1)
 
         start = time.time()
-        results, error = llm_service.ask_question(content, conversation_context=context[:-1])
+        results, error = llm_service.ask_question(content, conversation_context=context)
         duration = time.time() - start
 
         if error:
             return JsonResponse({'error': error}, status=400)
 
-        response_text = "Aucun CV pertinent trouvé. Reformulez votre question."
-        if results:
-            response_text = "Voici les CV les plus pertinents :\n\n" + "\n\n".join(
-                f"{i + 1}. **{r['filename']}** — Score LLM: {r['score_llm']}/10, FAISS: {r['score_faiss']}\nJustification: {r['justification']}"
-                for i, r in enumerate(results)
+        # Le détail des évaluations est enregistré à part : le message du bot ne garde qu'un titre
+        response_text = "Voici les CV les plus pertinents :" if results else \
+            "Aucun CV pertinent trouvé. Reformulez votre question."
+
+        # Réponse et évaluations enregistrées ensemble. Le message du bot est créé avec create()
+        # (et non bulk_create) pour que son id soit connu sur toutes les bases, MySQL compris
+        with timed("db_write", table="message"), transaction.atomic():
+            bot_msg = Message.objects.create(conversation=conversation, sender=None, content=response_text)
+            screening_results = []
+            if results:
+                screening_results = ScreeningResult.objects.bulk_create(
+                    build_screening_results(conversation, bot_msg, user_filter, results)
+                )
+            Conversation.objects.filter(pk=conversation.pk).update(
+                updated_at=timezone.now(), message_count=F('message_count') + 1
             )
 
-        bot_msg = Message.objects.create(
-            conversation=conversation,
-            sender=None,
-            content=response_text,
-            timestamp=timezone.now()
-        )
-
-        conversation.updated_at = timezone.now()
-        conversation.save()
-
         return JsonResponse({
             'success': True,
             'conversation_id': conversation.id,
@@ -185,7 +339,7 @@ def send_message(request):
                 'timestamp': bot_msg.timestamp.isoformat(),
                 'response_time': duration
             },
-            'results': results
+            'results': [serialize_screening_result(r) for r in screening_results]
         })
 
     except Exception as e:
@@ -216,9 +370,8 @@ def update_document(request, doc_id):
 # Statut d’indexation
 def indexing_status(request):
     user = get_user_or_session_id(request)
-    docs = DocumentUpload.objects.filter(user=get_user_if_authenticated(user))
-    total = docs.count()
-    indexed = docs.filter(is_indexed=True).count()
+    stats = get_document_stats(get_user_if_authenticated(user))
+    total, indexed = stats['total'], stats['indexed']
     return JsonResponse({
         'is_indexing': False,
         'progress': int((indexed / total * 100) if total > 0 else 0),
@@ -233,14 +386,81 @@ def indexing_status(request):
 def delete_document(request, doc_id):
     try:
         document = get_object_or_404(DocumentUpload, pk=doc_id, user=request.user)
-        filename = document.filename
+        filename, content_hash = document.filename, document.content_hash
         document.delete()
+        # Dernier upload de ce contenu : retirer le fichier stocké et ses vecteurs
+        if content_hash and not DocumentUpload.objects.filter(content_hash=content_hash).exists():
+            orphaned = IndexingService.remove_documents({content_hash})
+            delete_blobs([content_hash])
+            if orphaned:
+                # CV écartés comme doublons du document supprimé : à indexer à nouveau
+                hashes = DocumentUpload.objects.filter(filename__in=orphaned).values('content_hash')
+                DocumentUpload.objects.filter(content_hash__in=hashes).update(is_indexed=False, indexing_date=None)
+            llm_service.build_graph()
         messages.success(request, f'Le document "{filename}" a été supprimé avec succès.')
         return JsonResponse({'success': True, 'message': f'Document "{filename}" supprimé', 'document_id': doc_id})
     except Exception as e:
         logger.error(f"Erreur lors de la suppression du document {doc_id}: {str(e)}")
         return JsonResponse({'success': False, 'error': 'Erreur lors de la suppression du document'}, status=500)
 
+# API JSON paginées par clé (paramètres : cursor, limit)
+def paginated_response(queryset, ordering, request, serialize):
+    try:
+        items, next_cursor = keyset_paginate(
+            queryset, ordering,
+            cursor=request.GET.get('cursor'),
+            limit=parse_limit(request.GET.get('limit')),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'results': [serialize(i) for i in items], 'next_cursor': next_cursor})
+
+@require_GET
+def api_documents(request):
+    user_filter = get_user_if_authenticated(get_user_or_session_id(request))
+    queryset = DocumentUpload.objects.filter(user=user_filter).only(
+        'id', 'filename', 'file_size', 'upload_date', 'is_indexed', 'indexing_date'
+    )
+    return paginated_response(queryset, DOCUMENT_ORDERING, request, lambda d: {
+        'id': d.id,
+        'filename': d.filename,
+        'file_size': d.file_size,
+        'upload_date': d.upload_date.isoformat(),
+        'is_indexed': d.is_indexed,
+        'indexing_date': d.indexing_date.isoformat() if d.indexing_date else None,
+    })
+
+@require_GET
+def api_conversations(request):
+    user_filter = get_user_if_authenticated(get_user_or_session_id(request))
+    queryset = Conversation.objects.filter(user=user_filter).only('id', 'title', 'updated_at')
+    return paginated_response(queryset, CONVERSATION_ORDERING, request, lambda c: {
+        'id': c.id,
+        'title': c.title,
+        'updated_at': c.updated_at.isoformat(),
+    })
+
+@require_GET
+def api_messages(request, conversation_id):
+    """Messages du plus récent au plus ancien : le curseur permet de remonter l'historique"""
+    user_filter = get_user_if_authenticated(get_user_or_session_id(request))
+    if not Conversation.objects.filter(pk=conversation_id, user=user_filter).exists():
+        return JsonResponse({'error': 'Conversation introuvable'}, status=404)
+    queryset = with_screening_results(Message.objects.filter(conversation_id=conversation_id).only(
+        'id', 'sender_id', 'content', 'timestamp'
+    ))
+    return paginated_response(queryset, MESSAGE_ORDERING, request, lambda m: {
+        'id': m.id,
+        'is_user': m.sender_id is not None,
+        'content': m.content,
+        'timestamp': m.timestamp.isoformat(),
+        'results': [serialize_screening_result(r) for r in m.screening_results.all()],
+    })
+
+# Métriques Prometheus du pipeline RAG
+def metrics(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Déconnexion
 def logout_view(request):
     logout(request)
@@ -58,6 +58,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL : les lectures ne sont plus bloquées par les écritures concurrentes
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            # Prendre le verrou d'écriture dès le début de la transaction (évite "database is locked")
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -100,8 +107,43 @@ FAISS_INDEX_DIR = BASE_DIR / 'faiss_index'
 DATA_FOLDER.mkdir(parents=True, exist_ok=True)
 FAISS_INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
+# Seuils de similarité (Jaccard estimée) pour la déduplication à l'indexation
+DEDUP_DOCUMENT_THRESHOLD = float(os.getenv('DEDUP_DOCUMENT_THRESHOLD', '0.9'))
+DEDUP_CHUNK_THRESHOLD = float(os.getenv('DEDUP_CHUNK_THRESHOLD', '0.85'))
+# Nombre de CV à partir duquel un remplissage commun (références, mentions RGPD...) est indexé une seule fois
+DEDUP_BOILERPLATE_MIN_DOCUMENTS = int(os.getenv('DEDUP_BOILERPLATE_MIN_DOCUMENTS', '10'))
+
+# Découpage des CV : 'cv_sections' (par sections, en tokens) ou 'recursive' (en caractères).
+# Surchargeable par corpus via un fichier chunking.json dans DATA_FOLDER.
+CHUNKING = {
+    'strategy': os.getenv('CHUNKING_STRATEGY', 'cv_sections'),
+    'chunk_tokens': int(os.getenv('CHUNK_TOKENS', '400')),
+    'chunk_overlap_tokens': int(os.getenv('CHUNK_OVERLAP_TOKENS', '40')),
+    'chunk_size': 200,
+    'chunk_overlap': 20,
+}
+
+
 
 
+# Nombre de messages précédents envoyés au LLM comme contexte de conversation
+CHAT_HISTORY_MESSAGES = int(os.getenv('CHAT_HISTORY_MESSAGES', '20'))
+# Taille des pages (messages du chat, documents de l'accueil) avant chargement via l'API
+CHAT_PAGE_SIZE = 50
+
+# Journaliser chaque étape du pipeline RAG comme un span de trace (logger "chatbot.trace")
+RAG_TRACE_SPANS = os.getenv('RAG_TRACE_SPANS', 'False').lower() in ('true', '1', 'yes')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'chatbot.trace': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'